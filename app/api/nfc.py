@@ -1,21 +1,37 @@
 from fastapi import APIRouter, Depends, Path
 from pydantic import BaseModel
 from typing import Literal
-from datetime import datetime, timedelta, timezone
-import secrets
-import string
+from datetime import datetime
+import asyncio
+import hashlib
+import logging
 
-from app.core.auth import supabase_auth
+from cachetools import TTLCache
+
+from app.api.profiles import invalidate_profile_cache
+from app.core.auth import get_current_user
 from app.core.error_handling import ContactsException
 from app.core.crud import SupabaseCRUD
 from app.core.config import settings
+from app.core.nfc_cache import cache_token, get_cached_token, invalidate_token
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 nfc_crud = SupabaseCRUD("nfc_tokens")
 profile_crud = SupabaseCRUD("profiles")
+connections_crud = SupabaseCRUD("connections")
+
+# Hashes of tokens recently found to be unknown or expired, so repeated or
+# scanning attempts are rejected without a database round-trip
+_invalid_token_cache = TTLCache(maxsize=50_000, ttl=30)
 
 
+# The router's own request and response models, not those in app.schemas.nfc:
+# the server alone sets token lifetimes, so clients send no expires_at, and
+# the response is the row issue_nfc_token returns, without is_active or
+# created_at
 class NFCTokenCreate(BaseModel):
     profile_type: Literal["family", "friends", "work", "acquaintances"]
 
@@ -26,15 +42,26 @@ class NFCTokenResponse(BaseModel):
     expires_at: datetime
 
 
-def generate_token(length: int = 32) -> str:
-    """Generate a secure random token for NFC sharing"""
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(length))
+def hash_token(token: str) -> str:
+    """Hex-encoded SHA-256 of a token, as stored in nfc_tokens.token_hash"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def sweep_expired_tokens() -> None:
+    """Periodically deactivate expired tokens with a single bulk update"""
+    while True:
+        await asyncio.sleep(settings.NFC_TOKEN_SWEEP_INTERVAL_SECONDS)
+        try:
+            await nfc_crud.rpc("deactivate_expired_nfc_tokens")
+        except ValueError:
+            logger.exception("Failed to deactivate expired NFC tokens")
 
 
-@router.post("/generate", response_model=NFCTokenResponse)
+@router.post(
+    "/generate", response_model=None, responses={200: {"model": NFCTokenResponse}}
+)
 async def generate_nfc_token(
-    token_data: NFCTokenCreate, current_user=Depends(supabase_auth.get_current_user)
+    token_data: NFCTokenCreate, current_user=Depends(get_current_user)
 ):
     """
     Generate a new NFC token for sharing a specific profile
@@ -44,7 +71,7 @@ async def generate_nfc_token(
     try:
         # Verify the profile exists
         profiles = await profile_crud.read(
-            {"user_id": user_id, "type": token_data.profile_type}
+            {"user_id": user_id, "type": token_data.profile_type}, columns="id"
         )
 
         if not profiles:
@@ -53,42 +80,29 @@ async def generate_nfc_token(
                 message=f"Profile of type '{token_data.profile_type}' not found",
             )
 
-        # Generate expiration time (use timezone-aware datetime)
-        expires_at = datetime.now(timezone.utc) + timedelta(
-            minutes=settings.NFC_TOKEN_EXPIRE_MINUTES
-        )
-
-        # Generate token
-        token = generate_token()
-
-        # Invalidate existing tokens for this profile type
-        existing_tokens = await nfc_crud.read(
+        # Deactivate existing tokens for this profile type and issue the new
+        # one; the database mints the token and sets its expiry
+        rows = await nfc_crud.rpc(
+            "issue_nfc_token",
             {
-                "user_id": user_id,
-                "profile_type": token_data.profile_type,
-                "is_active": True,
-            }
+                "p_user": user_id,
+                "p_type": token_data.profile_type,
+                "p_lifetime_seconds": settings.NFC_TOKEN_EXPIRE_MINUTES * 60,
+            },
         )
 
-        for existing_token in existing_tokens:
-            await nfc_crud.update("id", existing_token["id"], {"is_active": False})
+        issued = rows[0]
+        for revoked_token_hash in issued["revoked_token_hashes"]:
+            invalidate_token(revoked_token_hash)
 
-        # Create new token
-        token_data_dict = {
-            "user_id": user_id,
-            "token": token,
-            "profile_type": token_data.profile_type,
-            "is_active": True,
-            "expires_at": expires_at.isoformat(),
+        # Respond with the row as stored by the database; it is trusted, so
+        # skip re-validating it through NFCTokenResponse
+        new_token = issued["token_row"]
+        return {
+            "token": new_token["token"],
+            "profile_type": new_token["profile_type"],
+            "expires_at": new_token["expires_at"],
         }
-
-        await nfc_crud.create(token_data_dict)
-
-        return NFCTokenResponse(
-            token=token,
-            profile_type=token_data_dict["profile_type"],
-            expires_at=expires_at,
-        )
     except ContactsException:
         raise
     except Exception as e:
@@ -100,43 +114,45 @@ async def validate_nfc_token(token: str = Path(...)):
     """
     Validate an NFC token and return the associated profile if valid
     """
-    try:
-        # Find token
-        tokens = await nfc_crud.read({"token": token, "is_active": True})
+    token_hash = hash_token(token)
 
-        if not tokens:
+    try:
+        # Serve recently validated tokens from memory
+        cached = get_cached_token(token_hash)
+        if cached is not None:
+            token_data, profile = cached
+            return {"profile": profile, "user_id": token_data["user_id"]}
+
+        # Reject tokens recently found to be invalid without a round-trip
+        if token_hash in _invalid_token_cache:
             raise ContactsException(
                 error_code="INVALID_TOKEN", message="Invalid or expired token"
             )
 
-        token_data = tokens[0]
-
-        # Check if token is expired
-        expires_at = datetime.fromisoformat(
-            token_data["expires_at"].replace("Z", "+00:00")
+        # Find unexpired token together with its profile
+        rows = await nfc_crud.rpc(
+            "get_active_token_with_profile", {"p_token_hash": token_hash}
         )
-        # Create a timezone-aware current time
-        now = datetime.now(timezone.utc)
 
-        if expires_at < now:
-            # Deactivate expired token
-            await nfc_crud.update("id", token_data["id"], {"is_active": False})
+        if not rows:
+            _invalid_token_cache[token_hash] = True
             raise ContactsException(
-                error_code="EXPIRED_TOKEN", message="Token has expired"
+                error_code="INVALID_TOKEN", message="Invalid or expired token"
             )
 
-        # Get associated profile
-        profile = await profile_crud.read(
-            {"user_id": token_data["user_id"], "type": token_data["profile_type"]}
-        )
+        row = rows[0]
+        token_data = row["token_row"]
+        profile = row["profile_row"]
 
         if not profile:
             raise ContactsException(
                 error_code="PROFILE_NOT_FOUND", message="Associated profile not found"
             )
 
+        cache_token(token_hash, token_data, profile, row["expires_in"])
+
         # Return profile data
-        return {"profile": profile[0], "user_id": token_data["user_id"]}
+        return {"profile": profile, "user_id": token_data["user_id"]}
     except ContactsException:
         raise
     except Exception as e:
@@ -145,24 +161,35 @@ async def validate_nfc_token(token: str = Path(...)):
 
 @router.post("/connect/{token}")
 async def connect_via_nfc(
-    token: str = Path(...), current_user=Depends(supabase_auth.get_current_user)
+    token: str = Path(...), current_user=Depends(get_current_user)
 ):
     """
     Connect with a user using their NFC token
     """
     user_id = current_user.id
-    connections_crud = SupabaseCRUD("connections")
+    token_hash = hash_token(token)
 
     try:
-        # Validate token
-        tokens = await nfc_crud.read({"token": token, "is_active": True})
+        # Reject tokens recently found to be invalid without a round-trip
+        if token_hash in _invalid_token_cache:
+            raise ContactsException(
+                error_code="INVALID_TOKEN", message="Invalid or expired token"
+            )
 
-        if not tokens:
+        # Validate token and fetch the shared profile alongside it
+        rows = await nfc_crud.rpc(
+            "get_active_token_with_profile", {"p_token_hash": token_hash}
+        )
+
+        if not rows:
+            _invalid_token_cache[token_hash] = True
             raise ContactsException(
                 error_code="INVALID_TOKEN", message="Invalid or expired token"
             )
 
-        token_data = tokens[0]
+        row = rows[0]
+        token_data = row["token_row"]
+        profile = row["profile_row"]
         target_user_id = token_data["user_id"]
 
         # Prevent self-connection
@@ -171,51 +198,38 @@ async def connect_via_nfc(
                 error_code="SELF_CONNECTION", message="Cannot connect with yourself"
             )
 
-        # Check if token is expired
-        expires_at = datetime.fromisoformat(
-            token_data["expires_at"].replace("Z", "+00:00")
-        )
-        # Create a timezone-aware current time
-        now = datetime.now(timezone.utc)
-
-        if expires_at < now:
-            # Deactivate expired token
-            await nfc_crud.update("id", token_data["id"], {"is_active": False})
-            raise ContactsException(
-                error_code="EXPIRED_TOKEN", message="Token has expired"
-            )
-
-        # Check if connection already exists
-        existing_connection = await connections_crud.read(
-            {"user_id": user_id, "connected_user_id": target_user_id}
-        )
-
-        if existing_connection:
+        if not profile:
             raise ContactsException(
-                error_code="CONNECTION_EXISTS", message="Connection already exists"
+                error_code="PROFILE_NOT_FOUND", message="Associated profile not found"
             )
 
-        # Create connection
+        # Create connection unless one already exists
         connection_data = {
             "user_id": user_id,
             "connected_user_id": target_user_id,
             "connection_type": token_data["profile_type"],
         }
 
-        new_connection = await connections_crud.create(connection_data)
+        new_connection = await connections_crud.insert_if_absent(
+            connection_data, on_conflict="user_id,connected_user_id"
+        )
+
+        if not new_connection:
+            raise ContactsException(
+                error_code="CONNECTION_EXISTS", message="Connection already exists"
+            )
 
         # Invalidate token after use
         await nfc_crud.update("id", token_data["id"], {"is_active": False})
+        invalidate_token(token_hash)
 
-        # Get profile data
-        profile = await profile_crud.read(
-            {"user_id": target_user_id, "type": token_data["profile_type"]}
-        )
+        # The new connection's profiles belong in the user's profile list
+        invalidate_profile_cache(user_id)
 
         return {
             "message": "Connection created successfully",
             "connection": new_connection,
-            "profile": profile[0] if profile else None,
+            "profile": profile,
         }
     except ContactsException:
         raise
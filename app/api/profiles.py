@@ -1,15 +1,23 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 from uuid import UUID
 from datetime import date
+import asyncio
+import logging
+import time
 
-from app.core.auth import supabase_auth
+from cachetools import TTLCache
+
+from app.core.auth import get_current_user
 from app.core.error_handling import ContactsException
-from app.core.crud import SupabaseCRUD
+from app.core.crud import DuplicateRecordError, SupabaseCRUD
+from app.core.nfc_cache import invalidate_user_tokens
 from app.models.models import ProfileType
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 profile_crud = SupabaseCRUD("profiles")
 family_profile_crud = SupabaseCRUD("family_profiles")
@@ -17,10 +25,101 @@ friends_profile_crud = SupabaseCRUD("friends_profiles")
 work_profile_crud = SupabaseCRUD("work_profiles")
 acquaintances_profile_crud = SupabaseCRUD("acquaintances_profiles")
 
+# Profile type values, bound once instead of looked up on every request
+FAMILY = ProfileType.FAMILY.value
+FRIENDS = ProfileType.FRIENDS.value
+WORK = ProfileType.WORK.value
+ACQUAINTANCES = ProfileType.ACQUAINTANCES.value
+
+# Recent get_profile/list_profiles results, keyed by user_id and then by
+# request, as (result, fresh_until) pairs. A user's own writes drop their
+# entry; otherwise results older than the fresh window are served while a
+# background task reloads them, and are discarded once the cache TTL lapses
+_PROFILE_CACHE_FRESH_SECONDS = 30
+_profile_cache = TTLCache(maxsize=10_000, ttl=120)
+
+# In-flight background reloads keyed by (user_id, request)
+_refresh_tasks: dict = {}
+
+# Type-specific detail tables keyed by profile type
+TYPE_CRUD = {
+    FAMILY: family_profile_crud,
+    FRIENDS: friends_profile_crud,
+    WORK: work_profile_crud,
+    ACQUAINTANCES: acquaintances_profile_crud,
+}
+
+# Names of each profile type as used in error messages
+PROFILE_NAMES = {
+    FAMILY: "family",
+    FRIENDS: "friends",
+    WORK: "work",
+    ACQUAINTANCES: "acquaintance",
+}
+
+
+def _set_cached(
+    user_id: str, key: tuple, value, entries: Optional[dict] = None
+) -> None:
+    """Cache a read result for the user, renewing their cache entry"""
+    entries = _profile_cache.get(user_id, {}) if entries is None else entries
+    entries[key] = (value, time.monotonic() + _PROFILE_CACHE_FRESH_SECONDS)
+    _profile_cache[user_id] = entries
+
+
+async def _refresh_cached(
+    user_id: str, key: tuple, load: Callable[[], Awaitable], entries: dict
+) -> None:
+    """Reload a stale read result, keeping the stale one if the reload fails"""
+    try:
+        value = await load()
+    except ContactsException:
+        # The profile is gone or no longer the user's
+        entries.pop(key, None)
+        return
+    except Exception:
+        logger.exception("Failed to refresh cached profiles")
+        return
+    finally:
+        _refresh_tasks.pop((user_id, key), None)
+
+    # Skip results loaded across an invalidation
+    if _profile_cache.get(user_id) is entries:
+        _set_cached(user_id, key, value, entries)
+
+
+async def _cached_read(user_id: str, key: tuple, load: Callable[[], Awaitable]):
+    """Serve a read from the user's cache, reloading stale results in the
+    background and loading missing ones inline"""
+    entries = _profile_cache.get(user_id)
+    if entries is None:
+        # Register the user's entries before loading, so an invalidation
+        # during the load can be detected
+        entries = _profile_cache[user_id] = {}
+    cached = entries.get(key)
+    if cached is None:
+        value = await load()
+        # Skip results loaded across an invalidation
+        if _profile_cache.get(user_id) is entries:
+            _set_cached(user_id, key, value, entries)
+        return value
+
+    value, fresh_until = cached
+    if time.monotonic() >= fresh_until and (user_id, key) not in _refresh_tasks:
+        _refresh_tasks[(user_id, key)] = asyncio.create_task(
+            _refresh_cached(user_id, key, load, entries)
+        )
+    return value
+
 
-# Input models for creating profiles
-class FamilyProfileCreate(BaseModel):
-    name: str
+def invalidate_profile_cache(user_id: str) -> None:
+    """Drop every cached read result for the user"""
+    _profile_cache.pop(user_id, None)
+
+
+# Fields shared by the create and update models of each profile type
+class _FamilyProfileFields(BaseModel):
+    name: Optional[str] = None
     photo: Optional[str] = None
     phone_number: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -30,8 +129,8 @@ class FamilyProfileCreate(BaseModel):
     model_config = {"str_strip_whitespace": True}
 
 
-class FriendsProfileCreate(BaseModel):
-    name: str
+class _FriendsProfileFields(BaseModel):
+    name: Optional[str] = None
     photo: Optional[str] = None
     phone_number: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -41,8 +140,8 @@ class FriendsProfileCreate(BaseModel):
     model_config = {"str_strip_whitespace": True}
 
 
-class WorkProfileCreate(BaseModel):
-    name: str
+class _WorkProfileFields(BaseModel):
+    name: Optional[str] = None
     photo: Optional[str] = None
     whatsapp: Optional[str] = None
     telegram: Optional[str] = None
@@ -53,287 +152,109 @@ class WorkProfileCreate(BaseModel):
     model_config = {"str_strip_whitespace": True}
 
 
-class AcquaintanceProfileCreate(BaseModel):
-    name: str
+class _AcquaintanceProfileFields(BaseModel):
+    name: Optional[str] = None
     photo: Optional[str] = None
     email: Optional[EmailStr] = None
 
     model_config = {"str_strip_whitespace": True}
 
 
-@router.post("/family", status_code=201)
-async def create_family_profile(
-    profile_data: FamilyProfileCreate,
-    current_user=Depends(supabase_auth.get_current_user),
-):
-    """
-    Create a new family profile for the authenticated user
-    """
-    user_id = current_user.id
+# Input models for creating profiles
+class FamilyProfileCreate(_FamilyProfileFields):
+    name: str
 
-    try:
-        # Check if user already has a family profile
-        existing_profiles = await profile_crud.read(
-            {"user_id": user_id, "type": ProfileType.FAMILY.value}
-        )
 
-        if existing_profiles:
-            raise ContactsException(
-                error_code="PROFILE_EXISTS", message="Family profile already exists"
-            )
+class FriendsProfileCreate(_FriendsProfileFields):
+    name: str
 
-        # Create base profile
-        base_profile = await profile_crud.create(
-            {
-                "user_id": user_id,
-                "name": profile_data.name,
-                "type": ProfileType.FAMILY.value,
-                "photo": profile_data.photo,
-            }
-        )
 
-        # Create family profile
-        family_profile = await family_profile_crud.create(
+class WorkProfileCreate(_WorkProfileFields):
+    name: str
+
+
+class AcquaintanceProfileCreate(_AcquaintanceProfileFields):
+    name: str
+
+
+async def create_typed_profile(
+    profile_type: str, profile_data: BaseModel, user_id: str
+) -> dict:
+    """Create the user's base and type-specific profile in one transaction"""
+    try:
+        profile = await profile_crud.rpc(
+            "create_profile_with_details",
             {
-                "profile_id": base_profile["id"],
-                "phone_number": profile_data.phone_number,
-                "email": profile_data.email,
-                "date_of_birth": (
-                    profile_data.date_of_birth.isoformat()
-                    if profile_data.date_of_birth
-                    else None
+                "p_user": user_id,
+                "p_type": profile_type,
+                "p_name": profile_data.name,
+                "p_photo": profile_data.photo,
+                "p_details": profile_data.model_dump(
+                    mode="json", exclude={"name", "photo"}
                 ),
-                "whatsapp": profile_data.whatsapp,
-            }
+            },
+        )
+        invalidate_profile_cache(user_id)
+        return profile
+    except DuplicateRecordError:
+        name = PROFILE_NAMES[profile_type].capitalize()
+        raise ContactsException(
+            error_code="PROFILE_EXISTS", message=f"{name} profile already exists"
         )
-
-        # Combine the results
-        result = {**base_profile, **family_profile}
-
-        return result
     except ContactsException:
         raise
     except Exception as e:
         raise ContactsException(error_code="PROFILE_CREATION_FAILED", message=str(e))
 
 
+@router.post("/family", status_code=201)
+async def create_family_profile(
+    profile_data: FamilyProfileCreate,
+    current_user=Depends(get_current_user),
+):
+    """
+    Create a new family profile for the authenticated user
+    """
+    return await create_typed_profile(FAMILY, profile_data, current_user.id)
+
+
 @router.post("/friends", status_code=201)
 async def create_friends_profile(
     profile_data: FriendsProfileCreate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Create a new friends profile for the authenticated user
     """
-    user_id = current_user.id
-
-    try:
-        # Check if user already has a friends profile
-        existing_profiles = await profile_crud.read(
-            {"user_id": user_id, "type": ProfileType.FRIENDS.value}
-        )
-
-        if existing_profiles:
-            raise ContactsException(
-                error_code="PROFILE_EXISTS", message="Friends profile already exists"
-            )
-
-        # Create base profile
-        base_profile = await profile_crud.create(
-            {
-                "user_id": user_id,
-                "name": profile_data.name,
-                "type": ProfileType.FRIENDS.value,
-                "photo": profile_data.photo,
-            }
-        )
-
-        # Create friends profile
-        friends_profile = await friends_profile_crud.create(
-            {
-                "profile_id": base_profile["id"],
-                "phone_number": profile_data.phone_number,
-                "email": profile_data.email,
-                "instagram": profile_data.instagram,
-                "snapchat": profile_data.snapchat,
-            }
-        )
-
-        # Combine the results
-        result = {**base_profile, **friends_profile}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_CREATION_FAILED", message=str(e))
+    return await create_typed_profile(FRIENDS, profile_data, current_user.id)
 
 
 @router.post("/work", status_code=201)
 async def create_work_profile(
     profile_data: WorkProfileCreate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Create a new work profile for the authenticated user
     """
-    user_id = current_user.id
-
-    try:
-        # Check if user already has a work profile
-        existing_profiles = await profile_crud.read(
-            {"user_id": user_id, "type": ProfileType.WORK.value}
-        )
-
-        if existing_profiles:
-            raise ContactsException(
-                error_code="PROFILE_EXISTS", message="Work profile already exists"
-            )
-
-        # Create base profile
-        base_profile = await profile_crud.create(
-            {
-                "user_id": user_id,
-                "name": profile_data.name,
-                "type": ProfileType.WORK.value,
-                "photo": profile_data.photo,
-            }
-        )
-
-        # Create work profile
-        work_profile = await work_profile_crud.create(
-            {
-                "profile_id": base_profile["id"],
-                "whatsapp": profile_data.whatsapp,
-                "telegram": profile_data.telegram,
-                "linkedin": profile_data.linkedin,
-                "resume": profile_data.resume,
-                "website": profile_data.website,
-            }
-        )
-
-        # Combine the results
-        result = {**base_profile, **work_profile}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_CREATION_FAILED", message=str(e))
+    return await create_typed_profile(WORK, profile_data, current_user.id)
 
 
 @router.post("/acquaintance", status_code=201)
 async def create_acquaintance_profile(
     profile_data: AcquaintanceProfileCreate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Create a new acquaintance profile for the authenticated user
     """
-    user_id = current_user.id
-
-    try:
-        # Check if user already has an acquaintance profile
-        existing_profiles = await profile_crud.read(
-            {"user_id": user_id, "type": ProfileType.ACQUAINTANCES.value}
-        )
-
-        if existing_profiles:
-            raise ContactsException(
-                error_code="PROFILE_EXISTS",
-                message="Acquaintance profile already exists",
-            )
-
-        # Create base profile
-        base_profile = await profile_crud.create(
-            {
-                "user_id": user_id,
-                "name": profile_data.name,
-                "type": ProfileType.ACQUAINTANCES.value,
-                "photo": profile_data.photo,
-            }
-        )
-
-        # Create acquaintance profile
-        acquaintance_profile = await acquaintances_profile_crud.create(
-            {"profile_id": base_profile["id"], "email": profile_data.email}
-        )
-
-        # Combine the results
-        result = {**base_profile, **acquaintance_profile}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_CREATION_FAILED", message=str(e))
-
-
-# Add these helper functions before the list_profiles endpoint
-async def get_type_specific_details(profile_type: str, profile_id: UUID) -> dict:
-    """Get the type-specific details for a profile"""
-    if profile_type == ProfileType.FAMILY.value:
-        return await family_profile_crud.get_by_id("profile_id", profile_id) or {}
-    elif profile_type == ProfileType.FRIENDS.value:
-        return await friends_profile_crud.get_by_id("profile_id", profile_id) or {}
-    elif profile_type == ProfileType.WORK.value:
-        return await work_profile_crud.get_by_id("profile_id", profile_id) or {}
-    elif profile_type == ProfileType.ACQUAINTANCES.value:
-        return (
-            await acquaintances_profile_crud.get_by_id("profile_id", profile_id) or {}
-        )
-    return {}
-
-
-async def get_enriched_profile(profile: dict, user_id: str) -> dict:
-    """Enrich a profile with its type-specific details"""
-    profile_id = profile["id"]
-    profile_type = profile["type"]
-
-    details = await get_type_specific_details(profile_type, profile_id)
-    return {**profile, **details, "is_own": profile["user_id"] == user_id}
-
-
-async def get_user_profiles(user_id: str) -> list:
-    """Get detailed profiles for a user"""
-    # Get all profiles for the user
-    profiles = await profile_crud.read({"user_id": user_id})
-
-    # Add details to each profile
-    return [await get_enriched_profile(profile, user_id) for profile in profiles]
-
-
-async def get_connection_profiles(user_id: str) -> list:
-    """Get profiles of users connected to the given user"""
-    connections_crud = SupabaseCRUD("connections")
-
-    # Get all user's connections
-    connections = await connections_crud.read({"user_id": user_id})
-
-    result = []
-    # Get profiles for each connected user
-    for connection in connections:
-        connected_user_id = connection["connected_user_id"]
-        connection_type = connection["connection_type"]
-
-        # Get profiles of the connected user
-        connected_profiles = await profile_crud.read({"user_id": connected_user_id})
-
-        # Add each profile with connection information
-        for profile in connected_profiles:
-            detailed_profile = await get_enriched_profile(profile, user_id)
-            detailed_profile["connection_id"] = connection["id"]
-            detailed_profile["connection_type"] = connection_type
-            detailed_profile["is_own"] = False
-            result.append(detailed_profile)
-
-    return result
+    return await create_typed_profile(ACQUAINTANCES, profile_data, current_user.id)
 
 
 @router.get("/")
 async def list_profiles(
     include_connections: bool = True,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     List all profiles for the authenticated user and optionally their connections
@@ -341,15 +262,16 @@ async def list_profiles(
     user_id = current_user.id
 
     try:
-        # Get user's own profiles
-        detailed_profiles = await get_user_profiles(user_id)
-
-        # If including connections, add connected users' profiles
-        if include_connections:
-            connection_profiles = await get_connection_profiles(user_id)
-            detailed_profiles.extend(connection_profiles)
-
-        return detailed_profiles
+        # Get user's own profiles, followed by connected users' profiles if
+        # requested, with their details joined in by the database
+        return await _cached_read(
+            user_id,
+            ("list", include_connections),
+            lambda: profile_crud.rpc(
+                "list_profiles_for_user",
+                {"p_user": user_id, "p_include_connections": include_connections},
+            ),
+        )
     except Exception as e:
         raise ContactsException(
             error_code="PROFILE_RETRIEVAL_FAILED",
@@ -357,51 +279,45 @@ async def list_profiles(
         )
 
 
+async def load_profile(profile_id: UUID, user_id: str) -> dict:
+    """Load one of the user's profiles together with its details"""
+    # Get the base profile
+    profile = await profile_crud.get_by_id("id", profile_id)
+
+    if not profile:
+        raise ContactsException(
+            error_code="PROFILE_NOT_FOUND", message="Profile not found"
+        )
+
+    # Verify that the profile belongs to the user
+    if profile["user_id"] != user_id:
+        raise ContactsException(
+            error_code="UNAUTHORIZED",
+            message="Not authorized to access this profile",
+        )
+
+    # Get the detailed profile based on type
+    type_crud = TYPE_CRUD.get(profile["type"])
+    details = {}
+    if type_crud:
+        details = await type_crud.get_by_id("profile_id", profile_id) or {}
+
+    # Combine the results
+    return {**profile, **details}
+
+
 @router.get("/{profile_id}")
-async def get_profile(
-    profile_id: UUID, current_user=Depends(supabase_auth.get_current_user)
-):
+async def get_profile(profile_id: UUID, current_user=Depends(get_current_user)):
     """
     Get a specific profile by ID
     """
     user_id = current_user.id
 
     try:
-        # Get the base profile
-        profile = await profile_crud.get_by_id("id", profile_id)
-
-        if not profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        # Verify that the profile belongs to the user
-        if profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to access this profile",
-            )
-
-        # Get the detailed profile based on type
-        profile_type = profile["type"]
-
-        if profile_type == ProfileType.FAMILY.value:
-            details = await family_profile_crud.get_by_id("profile_id", profile_id)
-        elif profile_type == ProfileType.FRIENDS.value:
-            details = await friends_profile_crud.get_by_id("profile_id", profile_id)
-        elif profile_type == ProfileType.WORK.value:
-            details = await work_profile_crud.get_by_id("profile_id", profile_id)
-        elif profile_type == ProfileType.ACQUAINTANCES.value:
-            details = await acquaintances_profile_crud.get_by_id(
-                "profile_id", profile_id
-            )
-        else:
-            details = {}
-
-        # Combine the results
-        result = {**profile, **details}
-
-        return result
+        # Serve a recent read of this profile from memory
+        return await _cached_read(
+            user_id, ("profile", profile_id), lambda: load_profile(profile_id, user_id)
+        )
     except ContactsException:
         raise
     except Exception:
@@ -410,54 +326,45 @@ async def get_profile(
         )
 
 
-# Add this helper function before the delete_profile endpoint
-async def delete_profile_by_type(profile_type: str, profile_id: UUID) -> None:
-    """Helper function to delete type-specific profile data"""
-    if profile_type == ProfileType.FAMILY.value:
-        await family_profile_crud.delete("profile_id", profile_id)
-    elif profile_type == ProfileType.FRIENDS.value:
-        await friends_profile_crud.delete("profile_id", profile_id)
-    elif profile_type == ProfileType.WORK.value:
-        await work_profile_crud.delete("profile_id", profile_id)
-    elif profile_type == ProfileType.ACQUAINTANCES.value:
-        await acquaintances_profile_crud.delete("profile_id", profile_id)
+async def check_profile_owner(profile_id: UUID, user_id: str, action: str) -> None:
+    """Raise if the profile does not exist or belongs to another user"""
+    profile = await profile_crud.get_by_id("id", profile_id)
+
+    if not profile:
+        raise ContactsException(
+            error_code="PROFILE_NOT_FOUND", message="Profile not found"
+        )
+
+    if profile["user_id"] != user_id:
+        raise ContactsException(
+            error_code="UNAUTHORIZED",
+            message=f"Not authorized to {action} this profile",
+        )
 
 
 @router.delete("/{profile_id}")
-async def delete_profile(
-    profile_id: UUID, current_user=Depends(supabase_auth.get_current_user)
-):
+async def delete_profile(profile_id: UUID, current_user=Depends(get_current_user)):
     """
     Delete a profile by ID
     """
     user_id = current_user.id
 
     try:
-        # Verify the profile exists and belongs to the user
-        existing_profile = await profile_crud.get_by_id("id", profile_id)
-
-        if not existing_profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        if existing_profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to delete this profile",
-            )
-
-        # Delete the type-specific profile
-        await delete_profile_by_type(existing_profile["type"], profile_id)
-
-        # Delete base profile
-        deleted = await profile_crud.delete("id", profile_id)
+        # Delete the base profile only if it belongs to the user; its
+        # type-specific row goes with it through ON DELETE CASCADE
+        deleted = await profile_crud.delete(
+            "id", profile_id, filters={"user_id": user_id}
+        )
 
         if not deleted:
+            await check_profile_owner(profile_id, user_id, "delete")
             raise ContactsException(
                 error_code="PROFILE_DELETE_FAILED", message="Failed to delete profile"
             )
 
+        # Tokens sharing the profile must no longer serve it
+        invalidate_profile_cache(user_id)
+        invalidate_user_tokens(user_id)
         return {"message": "Profile deleted successfully"}
 
     except ContactsException:
@@ -467,114 +374,81 @@ async def delete_profile(
 
 
 # PUT routes for updating profiles
-class FamilyProfileUpdate(BaseModel):
-    name: Optional[str] = None
-    photo: Optional[str] = None
-    phone_number: Optional[str] = None
-    email: Optional[EmailStr] = None
-    date_of_birth: Optional[date] = None
-    whatsapp: Optional[str] = None
-
-    model_config = {"str_strip_whitespace": True}
-
-
-class FriendsProfileUpdate(BaseModel):
-    name: Optional[str] = None
-    photo: Optional[str] = None
-    phone_number: Optional[str] = None
-    email: Optional[EmailStr] = None
-    instagram: Optional[str] = None
-    snapchat: Optional[str] = None
-
-    model_config = {"str_strip_whitespace": True}
+class FamilyProfileUpdate(_FamilyProfileFields):
+    pass
 
 
-class WorkProfileUpdate(BaseModel):
-    name: Optional[str] = None
-    photo: Optional[str] = None
-    whatsapp: Optional[str] = None
-    telegram: Optional[str] = None
-    linkedin: Optional[str] = None
-    resume: Optional[str] = None
-    website: Optional[str] = None
+class FriendsProfileUpdate(_FriendsProfileFields):
+    pass
 
-    model_config = {"str_strip_whitespace": True}
 
+class WorkProfileUpdate(_WorkProfileFields):
+    pass
 
-class AcquaintanceProfileUpdate(BaseModel):
-    name: Optional[str] = None
-    photo: Optional[str] = None
-    email: Optional[EmailStr] = None
 
-    model_config = {"str_strip_whitespace": True}
+class AcquaintanceProfileUpdate(_AcquaintanceProfileFields):
+    pass
 
 
-async def update_base_profile(profile_id: UUID, update_data: dict):
-    """Helper function to update base profile data"""
-    base_update = {k: v for k, v in update_data.items() if k in ["name", "photo"]}
-    if base_update:
-        return await profile_crud.update("id", profile_id, base_update)
-    return None
+# Fields written to the base profile and to each type-specific table
+_BASE_FIELDS = frozenset({"name", "photo"})
+TYPE_UPDATE_FIELDS = {
+    FAMILY: frozenset({"phone_number", "email", "date_of_birth", "whatsapp"}),
+    FRIENDS: frozenset({"phone_number", "email", "instagram", "snapchat"}),
+    WORK: frozenset({"whatsapp", "telegram", "linkedin", "resume", "website"}),
+    ACQUAINTANCES: frozenset({"email"}),
+}
 
 
-@router.put("/family/{profile_id}")
-async def update_family_profile(
+async def update_profile_with_details(
     profile_id: UUID,
-    profile_data: FamilyProfileUpdate,
-    current_user=Depends(supabase_auth.get_current_user),
-):
+    user_id: str,
+    profile_type: str,
+    update_data: dict,
+    type_update: dict,
+) -> Optional[dict]:
+    """Update the user's profile of this type and its details in one call"""
+    base_update = {k: update_data[k] for k in _BASE_FIELDS & update_data.keys()}
+    return await profile_crud.rpc(
+        "update_profile_with_details",
+        {
+            "p_profile_id": str(profile_id),
+            "p_user": user_id,
+            "p_type": profile_type,
+            "p_base": base_update,
+            "p_details": type_update,
+        },
+    )
+
+
+async def update_typed_profile(
+    profile_id: UUID, profile_type: str, profile_data: BaseModel, user_id: str
+) -> dict:
     """
-    Update an existing family profile
+    Update the base and type-specific profile together, provided the user owns
+    a profile of this type with this ID
     """
-    user_id = current_user.id
-
     try:
-        # Verify the profile exists and belongs to the user
-        existing_profile = await profile_crud.get_by_id("id", profile_id)
+        # Collect the type-specific fields set in the request
+        update_data = profile_data.model_dump(mode="json", exclude_unset=True)
+        fields = TYPE_UPDATE_FIELDS[profile_type]
+        type_update = {k: update_data[k] for k in fields & update_data.keys()}
 
-        if not existing_profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        if existing_profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to modify this profile",
-            )
+        result = await update_profile_with_details(
+            profile_id, user_id, profile_type, update_data, type_update
+        )
 
-        # Verify it's the correct type
-        if existing_profile["type"] != ProfileType.FAMILY.value:
+        if result is None:
+            await check_profile_owner(profile_id, user_id, "modify")
+            name = PROFILE_NAMES[profile_type]
+            article = "an" if name[0] in "aeiou" else "a"
             raise ContactsException(
                 error_code="PROFILE_TYPE_MISMATCH",
-                message="This is not a family profile",
+                message=f"This is not {article} {name} profile",
             )
 
-        # Update base profile (name, photo)
-        await update_base_profile(profile_id, profile_data.model_dump())
-
-        # Update family-specific fields
-        family_update = {
-            k: v
-            for k, v in profile_data.model_dump().items()
-            if k in ["phone_number", "email", "date_of_birth", "whatsapp"]
-            and v is not None
-        }
-
-        # Convert date to ISO format if present
-        if "date_of_birth" in family_update and family_update["date_of_birth"]:
-            family_update["date_of_birth"] = family_update["date_of_birth"].isoformat()
-
-        # Update family profile
-        if family_update:
-            await family_profile_crud.update("profile_id", profile_id, family_update)
-
-        # Get the updated profile
-        updated_profile = await profile_crud.get_by_id("id", profile_id)
-        updated_details = await family_profile_crud.get_by_id("profile_id", profile_id)
-
-        # Combine the results
-        result = {**updated_profile, **updated_details}
+        invalidate_profile_cache(user_id)
+        invalidate_user_tokens(user_id)
 
         return result
     except ContactsException:
@@ -583,189 +457,53 @@ async def update_family_profile(
         raise ContactsException(error_code="PROFILE_UPDATE_FAILED", message=str(e))
 
 
+@router.put("/family/{profile_id}")
+async def update_family_profile(
+    profile_id: UUID,
+    profile_data: FamilyProfileUpdate,
+    current_user=Depends(get_current_user),
+):
+    """
+    Update an existing family profile
+    """
+    return await update_typed_profile(profile_id, FAMILY, profile_data, current_user.id)
+
+
 @router.put("/friends/{profile_id}")
 async def update_friends_profile(
     profile_id: UUID,
     profile_data: FriendsProfileUpdate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Update an existing friends profile
     """
-    user_id = current_user.id
-
-    try:
-        # Verify the profile exists and belongs to the user
-        existing_profile = await profile_crud.get_by_id("id", profile_id)
-
-        if not existing_profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        if existing_profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to modify this profile",
-            )
-
-        # Verify it's the correct type
-        if existing_profile["type"] != ProfileType.FRIENDS.value:
-            raise ContactsException(
-                error_code="PROFILE_TYPE_MISMATCH",
-                message="This is not a friends profile",
-            )
-
-        # Update base profile (name, photo)
-        await update_base_profile(profile_id, profile_data.model_dump())
-
-        # Update friends-specific fields
-        friends_update = {
-            k: v
-            for k, v in profile_data.model_dump().items()
-            if k in ["phone_number", "email", "instagram", "snapchat"] and v is not None
-        }
-
-        # Update friends profile
-        if friends_update:
-            await friends_profile_crud.update("profile_id", profile_id, friends_update)
-
-        # Get the updated profile
-        updated_profile = await profile_crud.get_by_id("id", profile_id)
-        updated_details = await friends_profile_crud.get_by_id("profile_id", profile_id)
-
-        # Combine the results
-        result = {**updated_profile, **updated_details}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_UPDATE_FAILED", message=str(e))
+    return await update_typed_profile(
+        profile_id, FRIENDS, profile_data, current_user.id
+    )
 
 
 @router.put("/work/{profile_id}")
 async def update_work_profile(
     profile_id: UUID,
     profile_data: WorkProfileUpdate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Update an existing work profile
     """
-    user_id = current_user.id
-
-    try:
-        # Verify the profile exists and belongs to the user
-        existing_profile = await profile_crud.get_by_id("id", profile_id)
-
-        if not existing_profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        if existing_profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to modify this profile",
-            )
-
-        # Verify it's the correct type
-        if existing_profile["type"] != ProfileType.WORK.value:
-            raise ContactsException(
-                error_code="PROFILE_TYPE_MISMATCH",
-                message="This is not a work profile",
-            )
-
-        # Update base profile (name, photo)
-        await update_base_profile(profile_id, profile_data.model_dump())
-
-        # Update work-specific fields
-        work_update = {
-            k: v
-            for k, v in profile_data.model_dump().items()
-            if k in ["whatsapp", "telegram", "linkedin", "resume", "website"]
-            and v is not None
-        }
-
-        # Update work profile
-        if work_update:
-            await work_profile_crud.update("profile_id", profile_id, work_update)
-
-        # Get the updated profile
-        updated_profile = await profile_crud.get_by_id("id", profile_id)
-        updated_details = await work_profile_crud.get_by_id("profile_id", profile_id)
-
-        # Combine the results
-        result = {**updated_profile, **updated_details}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_UPDATE_FAILED", message=str(e))
+    return await update_typed_profile(profile_id, WORK, profile_data, current_user.id)
 
 
 @router.put("/acquaintance/{profile_id}")
 async def update_acquaintance_profile(
     profile_id: UUID,
     profile_data: AcquaintanceProfileUpdate,
-    current_user=Depends(supabase_auth.get_current_user),
+    current_user=Depends(get_current_user),
 ):
     """
     Update an existing acquaintance profile
     """
-    user_id = current_user.id
-
-    try:
-        # Verify the profile exists and belongs to the user
-        existing_profile = await profile_crud.get_by_id("id", profile_id)
-
-        if not existing_profile:
-            raise ContactsException(
-                error_code="PROFILE_NOT_FOUND", message="Profile not found"
-            )
-
-        if existing_profile["user_id"] != user_id:
-            raise ContactsException(
-                error_code="UNAUTHORIZED",
-                message="Not authorized to modify this profile",
-            )
-
-        # Verify it's the correct type
-        if existing_profile["type"] != ProfileType.ACQUAINTANCES.value:
-            raise ContactsException(
-                error_code="PROFILE_TYPE_MISMATCH",
-                message="This is not an acquaintance profile",
-            )
-
-        # Update base profile (name, photo)
-        await update_base_profile(profile_id, profile_data.model_dump())
-
-        # Update acquaintance-specific fields
-        acquaintance_update = {
-            k: v
-            for k, v in profile_data.model_dump().items()
-            if k in ["email"] and v is not None
-        }
-
-        # Update acquaintance profile
-        if acquaintance_update:
-            await acquaintances_profile_crud.update(
-                "profile_id", profile_id, acquaintance_update
-            )
-
-        # Get the updated profile
-        updated_profile = await profile_crud.get_by_id("id", profile_id)
-        updated_details = await acquaintances_profile_crud.get_by_id(
-            "profile_id", profile_id
-        )
-
-        # Combine the results
-        result = {**updated_profile, **updated_details}
-
-        return result
-    except ContactsException:
-        raise
-    except Exception as e:
-        raise ContactsException(error_code="PROFILE_UPDATE_FAILED", message=str(e))
+    return await update_typed_profile(
+        profile_id, ACQUAINTANCES, profile_data, current_user.id
+    )
@@ -1,14 +1,34 @@
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel, EmailStr
+import asyncio
+
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.security import HTTPAuthorizationCredentials
+from gotrue.errors import AuthError
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError
 from typing import Optional, Dict, Any
-from uuid import UUID
 
-from app.core.auth import supabase_auth
-from app.core.error_handling import ContactsException
+from app.core.auth import bearer_scheme, get_current_user, supabase_auth
+from app.core.error_handling import ContactsException, error_response
 from app.core.crud import SupabaseCRUD
-from app.models.models import ProfileType
+from app.core.nfc_cache import invalidate_user_tokens
 
 router = APIRouter()
+profile_crud = SupabaseCRUD("profiles")
+
+# Recent GET /profile results keyed by user_id; the user's own profile and
+# phone updates drop their entry, so the cache only saves repeat reads
+_user_profile_cache = TTLCache(maxsize=10_000, ttl=10)
+
+# Markers of in-flight GET /profile loads keyed by user_id; an update drops
+# the user's marker, so a load racing it is not cached
+_user_profile_loads = TTLCache(maxsize=10_000, ttl=10)
+
+
+def _invalidate_user_profile(user_id: str) -> None:
+    """Drop the user's cached profile and any load in flight"""
+    _user_profile_cache.pop(user_id, None)
+    _user_profile_loads.pop(user_id, None)
 
 
 class UserRegistration(BaseModel):
@@ -32,19 +52,58 @@ class PhoneVerificationCode(BaseModel):
     code: str
 
 
-@router.post("/register", status_code=201)
-async def register_user(user_data: UserRegistration):
+def json_body(model: type):
     """
-    User registration endpoint using Supabase Auth
+    Dependency validating the raw request body against a model in one pass
     """
-    try:
-        # Validate input data
-        if not user_data.password or len(user_data.password) < 8:
-            raise ContactsException(
-                error_code="INVALID_PASSWORD",
-                message="Password must be at least 8 characters long",
+    adapter = TypeAdapter(model)
+
+    async def parse(request: Request):
+        try:
+            return adapter.validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [
+                    {**error, "loc": ("body", *error["loc"])}
+                    for error in e.errors(include_url=False)
+                ]
             )
 
+    return parse
+
+
+_registration_body = json_body(UserRegistration)
+_login_body = json_body(UserLogin)
+_phone_code_body = json_body(PhoneVerificationCode)
+
+
+def json_body_openapi(model: type) -> dict:
+    """OpenAPI request body for an endpoint using json_body"""
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+            "required": True,
+        }
+    }
+
+
+@router.post(
+    "/register", status_code=201, openapi_extra=json_body_openapi(UserRegistration)
+)
+async def register_user(
+    user_data: UserRegistration = Depends(_registration_body),
+):
+    """
+    User registration endpoint using Supabase Auth
+    """
+    # Validate input data
+    if not user_data.password or len(user_data.password) < 8:
+        return error_response(
+            error_code="INVALID_PASSWORD",
+            message="Password must be at least 8 characters long",
+        )
+
+    try:
         # Use Supabase Auth for user registration
         auth_data = {
             "email": user_data.email,
@@ -55,7 +114,9 @@ async def register_user(user_data: UserRegistration):
         }
 
         # Register the user with Supabase Auth
-        response = supabase_auth.supabase.auth.sign_up(auth_data)
+        response = await asyncio.to_thread(
+            supabase_auth.supabase.auth.sign_up, auth_data
+        )
 
         return {
             "user_id": response.user.id,
@@ -63,20 +124,24 @@ async def register_user(user_data: UserRegistration):
             "phone": response.user.phone,
             "user_metadata": response.user.user_metadata,
         }
+    except AuthError as e:
+        # Rejected by Supabase Auth, e.g. the email is already registered
+        return error_response(error_code="REGISTRATION_FAILED", message=e.message)
     except Exception as e:
         # Use custom error handling
         raise ContactsException(error_code="REGISTRATION_FAILED", message=str(e))
 
 
-@router.post("/login")
-async def login_user(user_data: UserLogin):
+@router.post("/login", openapi_extra=json_body_openapi(UserLogin))
+async def login_user(user_data: UserLogin = Depends(_login_body)):
     """
     User login endpoint
     """
     try:
         # Use Supabase for authentication
-        response = supabase_auth.supabase.auth.sign_in_with_password(
-            {"email": user_data.email, "password": user_data.password}
+        response = await asyncio.to_thread(
+            supabase_auth.supabase.auth.sign_in_with_password,
+            {"email": user_data.email, "password": user_data.password},
         )
 
         return {
@@ -84,6 +149,12 @@ async def login_user(user_data: UserLogin):
             "refresh_token": response.session.refresh_token,
             "user_id": response.user.id,
         }
+    except AuthError as e:
+        # Wrong credentials are common, so answer without raising
+        return error_response(
+            error_code="LOGIN_FAILED",
+            message=e.message or "Login failed. Please check your credentials.",
+        )
     except Exception as e:
         raise ContactsException(
             error_code="LOGIN_FAILED",
@@ -93,37 +164,43 @@ async def login_user(user_data: UserLogin):
 
 @router.post("/phone/send-verification")
 async def send_phone_verification(
-    data: PhoneVerification, current_user=Depends(supabase_auth.get_current_user)
+    data: PhoneVerification, current_user=Depends(get_current_user)
 ):
     """
     Send a verification code to a user's phone
     """
     try:
         # Use Supabase to send the phone verification code
-        supabase_auth.supabase.auth.sign_in_with_otp({"phone": data.phone})
+        await asyncio.to_thread(
+            supabase_auth.supabase.auth.sign_in_with_otp, {"phone": data.phone}
+        )
 
         return {"message": "Verification code sent to your phone"}
     except Exception as e:
         raise ContactsException(error_code="PHONE_VERIFICATION_FAILED", message=str(e))
 
 
-@router.post("/phone/verify")
+@router.post("/phone/verify", openapi_extra=json_body_openapi(PhoneVerificationCode))
 async def verify_phone(
-    data: PhoneVerificationCode, current_user=Depends(supabase_auth.get_current_user)
+    data: PhoneVerificationCode = Depends(_phone_code_body),
+    current_user=Depends(get_current_user),
 ):
     """
     Verify a phone with the code sent
     """
     try:
         # Verify the phone with the provided code
-        supabase_auth.supabase.auth.verify_otp(
-            {"phone": data.phone, "token": data.code, "type": "sms"}
+        await asyncio.to_thread(
+            supabase_auth.supabase.auth.verify_otp,
+            {"phone": data.phone, "token": data.code, "type": "sms"},
         )
 
         # Update user metadata
-        supabase_auth.supabase.auth.update_user(
-            {"phone": data.phone, "phone_confirmed_at": "now()"}
+        await asyncio.to_thread(
+            supabase_auth.supabase.auth.update_user,
+            {"phone": data.phone, "phone_confirmed_at": "now()"},
         )
+        _invalidate_user_profile(current_user.id)
 
         return {"message": "Phone verified successfully"}
     except Exception as e:
@@ -131,17 +208,31 @@ async def verify_phone(
 
 
 @router.get("/profile")
-async def get_user_profile(current_user=Depends(supabase_auth.get_current_user)):
+async def get_user_profile(
+    current_user=Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
     """
     Get user profile with authentication
     """
+    cached = _user_profile_cache.get(current_user.id)
+    if cached is not None:
+        return cached
+
+    load = _user_profile_loads[current_user.id] = object()
     try:
-        # The user data is already available from the current_user dependency
-        return {
-            "id": current_user.id,
-            "email": current_user.email,
-            "phone": current_user.phone,
-            "user_metadata": current_user.user_metadata,
+        # The access token's claims go stale once the profile is updated, so
+        # read the current user data from Supabase
+        user = (
+            await asyncio.to_thread(
+                supabase_auth.supabase.auth.get_user, credentials.credentials
+            )
+        ).user
+        profile = {
+            "id": user.id,
+            "email": user.email,
+            "phone": user.phone,
+            "user_metadata": user.user_metadata,
         }
     except Exception:
         raise ContactsException(
@@ -149,19 +240,26 @@ async def get_user_profile(current_user=Depends(supabase_auth.get_current_user))
             message="Could not retrieve user profile",
         )
 
+    # Skip results loaded across an update
+    if _user_profile_loads.get(current_user.id) is load:
+        del _user_profile_loads[current_user.id]
+        _user_profile_cache[current_user.id] = profile
+    return profile
+
 
 @router.put("/profile")
 async def update_user_profile(
-    update_data: Dict[str, Any], current_user=Depends(supabase_auth.get_current_user)
+    update_data: Dict[str, Any], current_user=Depends(get_current_user)
 ):
     """
     Update user profile
     """
     try:
         # Update the user metadata
-        response = supabase_auth.supabase.auth.update_user(
-            {"user_metadata": update_data}
+        response = await asyncio.to_thread(
+            supabase_auth.supabase.auth.update_user, {"user_metadata": update_data}
         )
+        _invalidate_user_profile(current_user.id)
 
         return {
             "id": response.user.id,
@@ -174,58 +272,21 @@ async def update_user_profile(
 
 
 @router.delete("/profile")
-async def delete_user_account(current_user=Depends(supabase_auth.get_current_user)):
+async def delete_user_account(current_user=Depends(get_current_user)):
     """
     Delete the user's account and all associated data
     """
     user_id = current_user.id
 
     try:
-        # Get all profiles for the user
-        profile_crud = SupabaseCRUD("profiles")
-        profiles = await profile_crud.read({"user_id": user_id})
-
-        # Helper function to delete type-specific profile data
-        async def delete_profile_by_type(profile_type: str, profile_id: UUID) -> None:
-            if profile_type == ProfileType.FAMILY.value:
-                family_profile_crud = SupabaseCRUD("family_profiles")
-                await family_profile_crud.delete("profile_id", profile_id)
-            elif profile_type == ProfileType.FRIENDS.value:
-                friends_profile_crud = SupabaseCRUD("friends_profiles")
-                await friends_profile_crud.delete("profile_id", profile_id)
-            elif profile_type == ProfileType.WORK.value:
-                work_profile_crud = SupabaseCRUD("work_profiles")
-                await work_profile_crud.delete("profile_id", profile_id)
-            elif profile_type == ProfileType.ACQUAINTANCES.value:
-                acquaintances_profile_crud = SupabaseCRUD("acquaintances_profiles")
-                await acquaintances_profile_crud.delete("profile_id", profile_id)
-
-        # Delete all profiles
-        for profile in profiles:
-            profile_id = profile["id"]
-            profile_type = profile["type"]
-
-            # Delete the type-specific profile
-            await delete_profile_by_type(profile_type, profile_id)
-
-            # Delete the base profile
-            await profile_crud.delete("id", profile_id)
-
-        # Delete all connections
-        connections_crud = SupabaseCRUD("connections")
-
-        # Delete connections where user is the owner
-        await connections_crud.delete_many("user_id", user_id)
-
-        # Delete connections where user is the connected user
-        await connections_crud.delete_many("connected_user_id", user_id)
-
-        # Delete all NFC tokens
-        nfc_crud = SupabaseCRUD("nfc_tokens")
-        await nfc_crud.delete_many("user_id", user_id)
+        # Delete the user's profiles, connections and NFC tokens in a single
+        # database transaction
+        await profile_crud.rpc("delete_user_cascade", {"p_user": user_id})
+        invalidate_user_tokens(user_id)
+        _invalidate_user_profile(user_id)
 
         # Delete the Supabase user
-        supabase_auth.supabase.auth.admin.delete_user(user_id)
+        await asyncio.to_thread(supabase_auth.supabase.auth.admin.delete_user, user_id)
 
         return {"message": "User account and all associated data deleted successfully"}
     except Exception as e:
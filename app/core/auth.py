@@ -1,17 +1,58 @@
 from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from supabase import create_client
 from functools import wraps
+from jose import ExpiredSignatureError, JWTError, jwt
+from cachetools import TLRUCache
+from typing import NamedTuple, Optional
 from app.core.config import settings
+from app.core.database import SupabaseManager
+import asyncio
+import hashlib
+import time
+
+
+# Longest time a resolved user is served without asking Supabase again
+_USER_CACHE_TTL = 60
+
+# Users resolved from access tokens, keyed by a digest of the token; entries
+# never outlive the token's own expiry
+_user_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _key, entry, now: min(now + _USER_CACHE_TTL, entry[1]),
+    timer=time.time,
+)
+
+
+class TokenUser(NamedTuple):
+    """User identity carried by a verified Supabase access token"""
+
+    id: str
+    email: Optional[str]
+    phone: Optional[str]
+    user_metadata: dict
 
 
 class SupabaseAuth:
     def __init__(self):
-        self.supabase_url = settings.SUPABASE_URL
-        self.supabase_key = settings.SUPABASE_KEY
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
+        self.supabase = SupabaseManager.get_auth_client()
         self.security = HTTPBearer()
 
+    async def get_user(self, token: str):
+        """
+        Resolve a token with Supabase, reusing recent results for the same token
+        """
+        key = hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+        cached = _user_cache.get(key)
+        if cached is not None:
+            return cached[0]
+
+        user = await asyncio.to_thread(self.supabase.auth.get_user, token)
+
+        # Supabase has verified the token, so its expiry can be read as is
+        expires_at = jwt.get_unverified_claims(token).get("exp")
+        _user_cache[key] = (user, expires_at or time.time() + _USER_CACHE_TTL)
+        return user
+
     async def verify_token(
         self, request: Request, credentials: HTTPAuthorizationCredentials
     ):
@@ -20,7 +61,7 @@ class SupabaseAuth:
         """
         try:
             # Verify the token with Supabase
-            user = self.supabase.auth.get_user(credentials.credentials)
+            user = await self.get_user(credentials.credentials)
             return user
         except Exception:
             raise HTTPException(
@@ -29,6 +70,35 @@ class SupabaseAuth:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+    def decode_user(self, token: str) -> Optional[TokenUser]:
+        """
+        Verify a token with the project's JWT secret and read the user from it.
+
+        Returns None when the token cannot be verified locally, and raises
+        ExpiredSignatureError for tokens that verify but have expired.
+        """
+        try:
+            claims = jwt.decode(
+                token,
+                settings.JWT_SECRET_KEY,
+                algorithms=["HS256"],
+                audience="authenticated",
+                # python-jose skips claims a token lacks unless they are
+                # required, so insist on a user token's audience and subject
+                options={"require_aud": True, "require_sub": True, "require_exp": True},
+            )
+        except ExpiredSignatureError:
+            raise
+        except JWTError:
+            return None
+
+        return TokenUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            phone=claims.get("phone"),
+            user_metadata=claims.get("user_metadata") or {},
+        )
+
     async def get_current_user(
         self, credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())
     ):
@@ -36,9 +106,18 @@ class SupabaseAuth:
         Dependency to get the current authenticated user
         """
         try:
-            # Verify the token with Supabase
-            user = self.supabase.auth.get_user(credentials.credentials)
-            return user.user
+            # Verify the token locally, and with Supabase only when the JWT
+            # secret cannot verify it
+            user = self.decode_user(credentials.credentials)
+            if user is None:
+                resolved = (await self.get_user(credentials.credentials)).user
+                user = TokenUser(
+                    id=resolved.id,
+                    email=resolved.email,
+                    phone=resolved.phone,
+                    user_metadata=resolved.user_metadata or {},
+                )
+            return user
         except Exception:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,3 +152,19 @@ class SupabaseAuth:
 
 
 supabase_auth = SupabaseAuth()
+bearer_scheme = HTTPBearer()
+
+
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """
+    Dependency to get the current authenticated user, resolved once per request
+    and kept on request.state.user
+    """
+    user = getattr(request.state, "user", None)
+    if user is None:
+        user = await supabase_auth.get_current_user(credentials)
+        request.state.user = user
+    return user
@@ -1,5 +1,7 @@
+from datetime import timedelta
+from functools import cached_property
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +10,9 @@ class Settings(BaseSettings):
     # Supabase Configuration
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    SUPABASE_TIMEOUT: int = 30
+    SUPABASE_MAX_CONNECTIONS: int = 100
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 50
 
     # Application Settings
     ALLOWED_ORIGINS: str
@@ -16,16 +21,30 @@ class Settings(BaseSettings):
     # Security Settings
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     NFC_TOKEN_EXPIRE_MINUTES: int = 60
+    NFC_TOKEN_SWEEP_INTERVAL_SECONDS: int = 60
     JWT_SECRET_KEY: str
+    # Signs the API's own access tokens; kept apart from JWT_SECRET_KEY so
+    # they are never accepted as Supabase user tokens
+    ACCESS_TOKEN_SECRET_KEY: Optional[str] = None
 
     # Additional Settings
     MAX_PROFILES_PER_USER: int = 4
 
-    @property
+    @cached_property
     def allowed_origins_list(self) -> List[str]:
         """Convert ALLOWED_ORIGINS string to list."""
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
 
+    @cached_property
+    def access_token_ttl(self) -> timedelta:
+        """Lifetime of access tokens issued by the API."""
+        return timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    @cached_property
+    def nfc_token_ttl(self) -> timedelta:
+        """Lifetime of NFC sharing tokens."""
+        return timedelta(minutes=self.NFC_TOKEN_EXPIRE_MINUTES)
+
     # Environment-specific settings
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
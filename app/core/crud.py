@@ -1,42 +1,89 @@
-from supabase import create_client
+import asyncio
 from typing import Dict, Any, Optional, List
-from app.core.config import settings
+from app.core.database import SupabaseManager
+
+
+# Postgres SQLSTATE for unique constraint violations
+UNIQUE_VIOLATION = "23505"
+
+
+class DuplicateRecordError(ValueError):
+    """Raised when a write violates a unique constraint"""
 
 
 class SupabaseCRUD:
     def __init__(self, table_name: str):
-        self.supabase_url = settings.SUPABASE_URL
-        self.supabase_key = settings.SUPABASE_KEY
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
+        # Share the process-wide client so table handles are cheap wrappers
+        self.supabase = SupabaseManager.get_client()
         self.table_name = table_name
 
+    async def _execute(self, request):
+        """
+        Run a built request in a worker thread, as supabase-py blocks on I/O
+        """
+        return await asyncio.to_thread(request.execute)
+
     async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a new record in the specified table
         """
         try:
-            response = self.supabase.table(self.table_name).insert(data).execute()
+            response = await self._execute(
+                self.supabase.table(self.table_name).insert(data)
+            )
+            return response.data[0] if response.data else None
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                raise DuplicateRecordError(f"Duplicate record: {str(e)}")
+            raise ValueError(f"Error creating record: {str(e)}")
+
+    async def insert_if_absent(
+        self, data: Dict[str, Any], on_conflict: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Insert a record unless one already exists for the conflict columns
+
+        Returns None when the record already exists.
+        """
+        try:
+            response = await self._execute(
+                self.supabase.table(self.table_name).upsert(
+                    data, on_conflict=on_conflict, ignore_duplicates=True
+                )
+            )
             return response.data[0] if response.data else None
         except Exception as e:
             raise ValueError(f"Error creating record: {str(e)}")
 
     async def read(
-        self, query: Optional[Dict[str, Any]] = None
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        *,
+        columns: str = "*",
+        greater_than: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Read records from the table with optional filtering
+
+        Pass a comma-separated ``columns`` list to fetch only those columns,
+        ``greater_than`` to keep only records whose columns exceed the given
+        values, ``order_by`` to sort ascending by a column and ``limit`` to
+        cap the number of records returned.
         """
         try:
+            request = self.supabase.table(self.table_name).select(columns)
             if query:
                 # Apply filters if query is provided
-                response = (
-                    self.supabase.table(self.table_name)
-                    .select("*")
-                    .match(query)
-                    .execute()
-                )
-            else:
-                response = self.supabase.table(self.table_name).select("*").execute()
+                request = request.match(query)
+            for column, value in (greater_than or {}).items():
+                request = request.gt(column, value)
+            if order_by:
+                request = request.order(order_by)
+            if limit is not None:
+                request = request.limit(limit)
+            response = await self._execute(request)
             return response.data
         except Exception as e:
             raise ValueError(f"Error reading records: {str(e)}")
@@ -48,27 +95,31 @@ class SupabaseCRUD:
         Update a record by its ID
         """
         try:
-            response = (
+            response = await self._execute(
                 self.supabase.table(self.table_name)
                 .update(update_data)
                 .eq(id_column, id_value)
-                .execute()
             )
             return response.data[0] if response.data else None
         except Exception as e:
             raise ValueError(f"Error updating record: {str(e)}")
 
-    async def delete(self, id_column: str, id_value: Any) -> bool:
+    async def delete(
+        self,
+        id_column: str,
+        id_value: Any,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> bool:
         """
-        Delete a record by its ID
+        Delete a record by its ID, optionally only if it also matches filters
         """
         try:
-            response = (
-                self.supabase.table(self.table_name)
-                .delete()
-                .eq(id_column, id_value)
-                .execute()
+            request = (
+                self.supabase.table(self.table_name).delete().eq(id_column, id_value)
             )
+            for column, value in (filters or {}).items():
+                request = request.eq(column, value)
+            response = await self._execute(request)
             return len(response.data) > 0
         except Exception as e:
             raise ValueError(f"Error deleting record: {str(e)}")
@@ -78,11 +129,8 @@ class SupabaseCRUD:
         Delete multiple records by matching column value
         """
         try:
-            response = (
-                self.supabase.table(self.table_name)
-                .delete()
-                .eq(id_column, id_value)
-                .execute()
+            response = await self._execute(
+                self.supabase.table(self.table_name).delete().eq(id_column, id_value)
             )
             # Return true if any records were deleted
             return len(response.data) >= 0
@@ -96,12 +144,25 @@ class SupabaseCRUD:
         Retrieve a single record by its ID
         """
         try:
-            response = (
-                self.supabase.table(self.table_name)
-                .select("*")
-                .eq(id_column, id_value)
-                .execute()
+            response = await self._execute(
+                self.supabase.table(self.table_name).select("*").eq(id_column, id_value)
             )
             return response.data[0] if response.data else None
         except Exception as e:
             raise ValueError(f"Error retrieving record: {str(e)}")
+
+    async def rpc(
+        self, function_name: str, params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Call a Postgres function exposed through PostgREST
+        """
+        try:
+            response = await self._execute(
+                self.supabase.rpc(function_name, params or {})
+            )
+            return response.data
+        except Exception as e:
+            if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                raise DuplicateRecordError(f"Duplicate record: {str(e)}")
+            raise ValueError(f"Error calling function: {str(e)}")
@@ -1,10 +1,108 @@
-from supabase import create_client, Client
+import logging
+import threading
+
+from gotrue.http_clients import SyncClient as GoTrueSyncClient
+from httpx import Limits, Timeout
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.utils import SyncClient
+from supabase import Client, ClientOptions, SupabaseAuthClient
 from app.core.config import settings
-from typing import Optional, AsyncGenerator
+from typing import Dict, Optional, AsyncGenerator, Union
+
+logger = logging.getLogger(__name__)
+
+
+def pool_limits() -> Limits:
+    """Connection pool size shared by the PostgREST and Auth sessions."""
+    return Limits(
+        max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client using a sized HTTP/2 keep-alive connection pool."""
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, Timeout],
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=pool_limits(),
+        )
+
+
+class PooledSupabaseClient(Client):
+    """Supabase client whose PostgREST and Auth sessions use the sized pool."""
+
+    @staticmethod
+    def _init_supabase_auth_client(
+        auth_url: str,
+        client_options: ClientOptions,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> SupabaseAuthClient:
+        return SupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=GoTrueSyncClient(
+                timeout=settings.SUPABASE_TIMEOUT,
+                verify=verify,
+                proxy=proxy,
+                follow_redirects=True,
+                http2=True,
+                limits=pool_limits(),
+            ),
+        )
+
+    @staticmethod
+    def _init_postgrest_client(
+        rest_url: str,
+        headers: Dict[str, str],
+        schema: str,
+        timeout: Union[int, float, Timeout] = DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> SyncPostgrestClient:
+        # Also used when supabase-py rebuilds PostgREST after auth events
+        return PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+        )
 
 
 class SupabaseManager:
     _instance: Optional[Client] = None
+    _auth_instance: Optional[Client] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _create_client() -> Client:
+        return PooledSupabaseClient(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY,
+            options=ClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT),
+        )
 
     @classmethod
     def get_client(cls) -> Client:
@@ -15,9 +113,41 @@ class SupabaseManager:
             Supabase Client instance
         """
         if cls._instance is None:
-            cls._instance = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls._create_client()
         return cls._instance
 
+    @classmethod
+    def get_auth_client(cls) -> Client:
+        """
+        Create or return an existing Supabase client for auth calls.
+
+        Signing users in stores their session on the client, and supabase-py
+        then sends that user's JWT on every PostgREST request, so auth calls
+        use this client rather than the one shared by the CRUD layer.
+
+        Returns:
+            Supabase Client instance
+        """
+        if cls._auth_instance is None:
+            with cls._lock:
+                if cls._auth_instance is None:
+                    cls._auth_instance = cls._create_client()
+        return cls._auth_instance
+
+    @classmethod
+    def warm_up(cls) -> None:
+        """
+        Create both clients and open their pooled connections ahead of the
+        first request, so no request pays for DNS lookup and TLS handshakes.
+        """
+        try:
+            cls.get_client().postgrest.session.head("/")
+            cls.get_auth_client().auth._request("GET", "health", no_resolve_json=True)
+        except Exception:
+            logger.warning("Failed to warm up Supabase connections", exc_info=True)
+
 
 async def get_supabase_client() -> AsyncGenerator[Client, None]:
     """
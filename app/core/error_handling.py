@@ -1,4 +1,5 @@
 from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, ValidationError
 from typing import Optional, Dict, Any
 
@@ -31,6 +32,21 @@ class ContactsException(HTTPException):
         super().__init__(status_code=status_code, detail=error_response.model_dump())
 
 
+def error_response(
+    error_code: str,
+    message: str,
+    status_code: int = status.HTTP_400_BAD_REQUEST,
+) -> ORJSONResponse:
+    """
+    Build the same response as a ContactsException without raising one, for
+    expected failures on hot paths
+    """
+    return ORJSONResponse(
+        status_code=status_code,
+        content=ErrorResponse(error_code=error_code, message=message).model_dump(),
+    )
+
+
 def handle_validation_error(exc: ValidationError) -> ContactsException:
     """
     Convert Pydantic validation errors to a standardized error response
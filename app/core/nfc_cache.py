@@ -0,0 +1,63 @@
+from cachetools import TLRUCache, TTLCache
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+# Longest time a validated token is served from memory
+TOKEN_CACHE_MAX_TTL = settings.NFC_TOKEN_EXPIRE_MINUTES * 60
+
+# Validated token hashes mapped to (token_data, profile, ttl); each entry lives
+# until its token expires, capped at the configured token lifetime
+_token_cache = TLRUCache(
+    maxsize=10_000, ttu=lambda _token_hash, entry, now: now + entry[2]
+)
+
+
+class _TokenIndex(TTLCache):
+    """
+    Owner user_id mapped to the hashes of their cached tokens; a user evicted
+    to make room takes their tokens with them, so no cached token outlives
+    its link to the owner
+    """
+
+    def popitem(self):
+        user_id, token_hashes = super().popitem()
+        for token_hash in token_hashes:
+            _token_cache.pop(token_hash, None)
+        return user_id, token_hashes
+
+
+# Lets entries be dropped when the owner's profiles change or their account is
+# deleted. Each write renews the user's TTL, so it only lapses after all of
+# their tokens have expired
+_token_hashes_by_user = _TokenIndex(maxsize=10_000, ttl=TOKEN_CACHE_MAX_TTL)
+
+
+def get_cached_token(token_hash: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+    """Return the cached (token_data, profile) for a token hash, if any"""
+    cached = _token_cache.get(token_hash)
+    return cached[:2] if cached is not None else None
+
+
+def cache_token(
+    token_hash: str, token_data: Dict[str, Any], profile: Any, expires_in: float
+) -> None:
+    """Cache a validated token with its owner's profile until it expires"""
+    ttl = min(expires_in, TOKEN_CACHE_MAX_TTL)
+    _token_cache[token_hash] = (token_data, profile, ttl)
+    user_id = token_data["user_id"]
+    hashes = _token_hashes_by_user.get(user_id, set())
+    hashes.add(token_hash)
+    _token_hashes_by_user[user_id] = hashes
+
+
+def invalidate_token(token_hash: str) -> None:
+    """Drop a token from the validation cache"""
+    _token_cache.pop(token_hash, None)
+
+
+def invalidate_user_tokens(user_id: str) -> None:
+    """Drop every cached token owned by the user"""
+    for token_hash in _token_hashes_by_user.pop(user_id, ()):
+        _token_cache.pop(token_hash, None)
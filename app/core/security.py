@@ -1,14 +1,13 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional, NamedTuple
 import secrets
+import time
 
-from passlib.context import CryptContext
 from jose import jwt
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class NFCTokenDetails(NamedTuple):
     """Structured representation of NFC token details."""
@@ -17,34 +16,47 @@ class NFCTokenDetails(NamedTuple):
     expires_at: datetime
 
 
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """
+    Build the bcrypt password context on first use.
+
+    Supabase Auth handles passwords for the API, so passlib and bcrypt are
+    only imported when a local hash is actually needed.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def get_password_hash(password: str) -> str:
     """
     Generate a secure hash for the given password.
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify if the plain password matches the hashed password.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token with optional expiration.
     """
-    to_encode = data.copy()
+    if not settings.ACCESS_TOKEN_SECRET_KEY:
+        raise ValueError("ACCESS_TOKEN_SECRET_KEY is not configured")
 
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode = data.copy()
 
-    to_encode.update({"exp": expire})
+    # JWT expiry is encoded as epoch seconds, so compute it as such
+    lifetime = expires_delta or settings.access_token_ttl
+    to_encode["exp"] = int(time.time() + lifetime.total_seconds())
 
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    return jwt.encode(to_encode, settings.ACCESS_TOKEN_SECRET_KEY, algorithm="HS256")
 
 
 def generate_nfc_token(
@@ -61,12 +73,12 @@ def generate_nfc_token(
     Returns:
         NFCTokenDetails with token and expiration time
     """
-    expiry = expiry or settings.NFC_SHARE_EXPIRY
+    lifetime = expiry or settings.nfc_token_ttl.total_seconds()
 
     # Generate a cryptographically secure token
     token = secrets.token_urlsafe(32)
 
     # Token expires after specified duration
-    expires_at = datetime.utcnow() + timedelta(seconds=expiry)
+    expires_at = datetime.fromtimestamp(time.time() + lifetime, tz=timezone.utc)
 
     return NFCTokenDetails(token=token, expires_at=expires_at)
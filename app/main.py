@@ -1,13 +1,17 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 # Import routers and middleware
 from app.api import users
 from app.api import profiles
 from app.api import nfc
 from app.core.auth import supabase_auth
+from app.core.database import SupabaseManager
 from app.core.error_handling import ContactsException
 from app.core.config import settings
 
@@ -15,6 +19,20 @@ from app.core.config import settings
 load_dotenv()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up Supabase connections and run background maintenance tasks for the
+    lifetime of the application
+    """
+    await asyncio.to_thread(SupabaseManager.warm_up)
+    token_sweeper = asyncio.create_task(nfc.sweep_expired_tokens())
+    try:
+        yield
+    finally:
+        token_sweeper.cancel()
+
+
 def create_app() -> FastAPI:
     """
     Application factory function
@@ -23,6 +41,8 @@ def create_app() -> FastAPI:
         title="Contacts Backend",
         description="Privacy-first social networking platform backend",
         version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # Configure CORS
@@ -37,7 +57,7 @@ def create_app() -> FastAPI:
     # Configure global exception handlers
     @app.exception_handler(ContactsException)
     async def custom_exception_handler(request, exc):
-        return JSONResponse(status_code=exc.status_code, content=exc.detail)
+        return ORJSONResponse(status_code=exc.status_code, content=exc.detail)
 
     # Include routers
     app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -1,37 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from supabase import Client
 
-from app.core.database import get_supabase_client
+from app.core.database import SupabaseManager
 from app.core.security import get_current_user
 from app.models.models import UserCreate, UserInDB, UserResponse
 from app.services.services import AuthService, ProfileService, NFCSharingService
 
+# Fields returned for a user; rows from the service layer are trusted, so
+# responses are built by picking these fields instead of re-validating
+_USER_RESPONSE_FIELDS = frozenset(UserResponse.model_fields)
+
+# Services are stateless, so each is created once and shared by all requests.
+# Auth calls store the signed-in session on their client, so AuthService uses
+# the client reserved for auth rather than the shared data client.
+auth_service = AuthService(SupabaseManager.get_auth_client())
+profile_service = ProfileService(SupabaseManager.get_client())
+nfc_service = NFCSharingService(SupabaseManager.get_client())
+
 # Auth Router
 auth_router = APIRouter()
 
 
-@auth_router.post("/register", response_model=UserResponse)
-async def register_user(
-    user: UserCreate, supabase_client: Client = Depends(get_supabase_client)
-):
+@auth_router.post(
+    "/register", response_model=None, responses={200: {"model": UserResponse}}
+)
+async def register_user(user: UserCreate):
     """Register a new user"""
     try:
-        auth_service = AuthService(supabase_client)
         registered_user = await auth_service.register_user(user)
-        return UserResponse(**registered_user.model_dump())
+        return registered_user.model_dump(include=_USER_RESPONSE_FIELDS)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @auth_router.post("/token")
-async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    supabase_client: Client = Depends(get_supabase_client),
-):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """OAuth2 compatible token login"""
     try:
-        auth_service = AuthService(supabase_client)
         user = await auth_service.authenticate_user(
             form_data.username, form_data.password
         )
@@ -52,11 +57,9 @@ profile_router = APIRouter()
 async def update_profile(
     profile_update: dict,  # Flexible profile update
     current_user: UserInDB = Depends(get_current_user),
-    supabase_client: Client = Depends(get_supabase_client),
 ):
     """Update profile for the current user"""
     try:
-        profile_service = ProfileService(supabase_client)
         updated_profile = await profile_service.update_profile(
             current_user.id, profile_update
         )
@@ -75,11 +78,9 @@ async def get_current_user_profile(current_user: UserInDB = Depends(get_current_
 async def get_specific_profile(
     profile_type: str,
     current_user: UserInDB = Depends(get_current_user),
-    supabase_client: Client = Depends(get_supabase_client),
 ):
     """Retrieve a specific profile for the current user"""
     try:
-        profile_service = ProfileService(supabase_client)
         profile = await profile_service.get_specific_profile(
             current_user.id, profile_type
         )
@@ -96,11 +97,9 @@ nfc_router = APIRouter()
 async def generate_nfc_token(
     profile_type: str,
     current_user: UserInDB = Depends(get_current_user),
-    supabase_client: Client = Depends(get_supabase_client),
 ):
     """Generate an NFC sharing token for a specific profile"""
     try:
-        nfc_service = NFCSharingService(supabase_client)
         nfc_token = await nfc_service.generate_nfc_token(current_user.id, profile_type)
         return nfc_token
     except ValueError as e:
@@ -111,11 +110,9 @@ async def generate_nfc_token(
 async def share_profile_via_nfc(
     nfc_token: str,
     current_user: UserInDB = Depends(get_current_user),
-    supabase_client: Client = Depends(get_supabase_client),
 ):
     """Share a profile via NFC token"""
     try:
-        nfc_service = NFCSharingService(supabase_client)
         shared_profile = await nfc_service.share_profile_via_nfc(
             current_user.id, nfc_token
         )
@@ -125,11 +122,7 @@ async def share_profile_via_nfc(
 
 
 @nfc_router.get("/tokens")
-async def get_user_nfc_tokens(
-    current_user: UserInDB = Depends(get_current_user),
-    supabase_client: Client = Depends(get_supabase_client),
-):
+async def get_user_nfc_tokens(current_user: UserInDB = Depends(get_current_user)):
     """Retrieve all NFC tokens for the current user"""
-    nfc_service = NFCSharingService(supabase_client)
     tokens = await nfc_service.get_user_nfc_tokens(current_user.id)
     return tokens
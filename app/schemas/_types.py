@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Annotated, Optional
+
+from pydantic import Field, StringConstraints
+
+from app.models.models import ConnectionType
+
+
+# Shared field types, so schemas reuse one validator instead of each field
+# compiling its own
+
+ProfileTypeStr = Annotated[
+    str, StringConstraints(pattern=r"^(family|friends|work|acquaintances)$")
+]
+
+OptionalDatetime = Annotated[Optional[datetime], Field(default=None)]
+OptionalInt = Annotated[Optional[int], Field(default=None)]
+OptionalStr = Annotated[Optional[str], Field(default=None)]
+
+ConnectionTypeField = Annotated[
+    ConnectionType,
+    Field(
+        default=ConnectionType.ACQUAINTANCE,
+        description="Default connection type if not specified",
+    ),
+]
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 from datetime import datetime
 from app.models.models import ConnectionType
+from app.schemas._types import ConnectionTypeField
 
 
 class ConnectionCreate(BaseModel):
@@ -23,7 +24,4 @@ class ConnectionRequest(BaseModel):
     """Schema for incoming connection requests"""
 
     requester_id: int
-    connection_type: ConnectionType = Field(
-        default=ConnectionType.ACQUAINTANCE,
-        description="Default connection type if not specified",
-    )
+    connection_type: ConnectionTypeField
@@ -2,16 +2,14 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
+from app.schemas._types import OptionalDatetime, OptionalInt, ProfileTypeStr
+
 
 class NFCTokenCreate(BaseModel):
     """Schema for creating an NFC token"""
 
-    profile_type: str = Field(
-        ...,
-        description="Type of profile to share",
-        pattern="^(family|friends|work|acquaintances)$",
-    )
-    expires_at: Optional[datetime] = None
+    profile_type: ProfileTypeStr = Field(..., description="Type of profile to share")
+    expires_at: OptionalDatetime
 
 
 class NFCTokenResponse(BaseModel):
@@ -28,4 +26,4 @@ class NFCShareRequest(BaseModel):
     """Schema for NFC sharing request"""
 
     token: str
-    target_user_id: Optional[int] = None  # Optional for anonymous sharing
+    target_user_id: OptionalInt  # Optional for anonymous sharing
@@ -1,13 +1,16 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List
+from typing import List
 from datetime import datetime
 
+from app.schemas._types import OptionalDatetime, OptionalStr, ProfileTypeStr
+from app.schemas.nfc import NFCTokenCreate, NFCTokenResponse  # noqa: F401
+
 
 class UserBase(BaseModel):
     """Base user schema for common user attributes."""
 
     email: EmailStr
-    phone_number: Optional[str] = None
+    phone_number: OptionalStr
 
 
 class UserCreate(UserBase):
@@ -23,7 +26,7 @@ class UserResponse(UserBase):
     is_active: bool
     is_verified: bool
     created_at: datetime
-    last_login: Optional[datetime] = None
+    last_login: OptionalDatetime
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -32,8 +35,8 @@ class ProfileBase(BaseModel):
     """Base profile schema."""
 
     name: str
-    type: str = Field(..., pattern="^(family|friends|work|acquaintances)$")
-    visibility_settings: Optional[str] = None
+    type: ProfileTypeStr
+    visibility_settings: OptionalStr
 
 
 class ProfileCreate(ProfileBase):
@@ -51,21 +54,6 @@ class ProfileResponse(ProfileBase):
     model_config = ConfigDict(from_attributes=True)
 
 
-class NFCTokenCreate(BaseModel):
-    """Schema for creating an NFC sharing token."""
-
-    profile_id: int
-
-
-class NFCTokenResponse(BaseModel):
-    """Response schema for NFC token."""
-
-    token: str
-    expires_at: datetime
-
-    model_config = ConfigDict(from_attributes=True)
-
-
 class UserProfilesResponse(UserResponse):
     """Response schema including user's profiles."""
 
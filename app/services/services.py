@@ -1,18 +1,60 @@
-import uuid
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import asyncio
+from datetime import timedelta
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 
-from supabase import Client
-from supabase import AuthApiError
+import httpx
+from gotrue.errors import AuthError
 
-from app.core.security import get_password_hash, verify_password, create_access_token
-from app.models.models import UserCreate, UserInDB
+from app.core.crud import SupabaseCRUD
+from app.core.nfc_cache import invalidate_token
+from app.core.security import create_access_token
+from app.models.models import ProfileType, UserCreate, UserInDB
 
+if TYPE_CHECKING:
+    from supabase import Client
 
-class AuthService:
-    def __init__(self, supabase_client: Client):
+# Hot table reads and writes go through the CRUD layer, which shares the
+# process-wide pooled client and keeps blocking I/O off the event loop
+users_crud = SupabaseCRUD("users")
+nfc_crud = SupabaseCRUD("nfc_tokens")
+profile_crud = SupabaseCRUD("profiles")
+
+_VALID_PROFILE_TYPES = frozenset({"personal", "professional", "social"})
+_VALID_PROFILE_TYPES_STR = ", ".join(sorted(_VALID_PROFILE_TYPES))
+
+# Profile types NFC tokens can share, as defined by the profile_type enum
+_NFC_PROFILE_TYPES = frozenset(t.value for t in ProfileType)
+_NFC_PROFILE_TYPES_STR = ", ".join(sorted(_NFC_PROFILE_TYPES))
+
+# Lifetime of NFC sharing tokens (24 hours)
+_TOKEN_TTL_SECONDS = int(timedelta(hours=24).total_seconds())
+
+# Most active NFC tokens listed per user
+_NFC_TOKEN_LIST_LIMIT = 50
+
+# Lifetime of access tokens issued by AuthService
+_ACCESS_TOKEN_TTL = timedelta(minutes=30)
+
+# Profile fields stored by Supabase Auth; the password lives only there
+_AUTH_FIELDS = frozenset({"email", "password", "phone"})
+_AUTH_ONLY_FIELDS = frozenset({"password"})
+
+
+class SupabaseService:
+    """
+    Base for services; instances are stateless apart from the shared client,
+    so one instance can serve every request
+    """
+
+    __slots__ = ("supabase",)
+
+    def __init__(self, supabase_client: "Client"):
         self.supabase = supabase_client
 
+
+class AuthService(SupabaseService):
+    __slots__ = ()
+
     async def register_user(self, user: UserCreate) -> UserInDB:
         """
         Register a new user in Supabase
@@ -25,27 +67,29 @@ class AuthService:
         """
         try:
             # Sign up with Supabase Auth
-            supabase_user = self.supabase.auth.sign_up(
-                {"email": user.email, "password": user.password}
+            supabase_user = await asyncio.to_thread(
+                self.supabase.auth.sign_up,
+                {"email": user.email, "password": user.password},
             )
 
             # Prepare user data for database insertion
             new_user_data = {
                 "id": supabase_user.user.id,
                 "email": user.email,
-                "hashed_password": get_password_hash(user.password),
                 "is_active": True,
                 "is_verified": False,
                 "phone_number": user.phone_number,
             }
 
             # Insert user in Supabase Users table
-            self.supabase.table("users").insert(new_user_data).execute()
+            await users_crud.create(new_user_data)
 
-            return UserInDB(**new_user_data)
+            # Built from validated input and the Supabase user, so skip
+            # validating it again
+            return UserInDB.model_construct(**new_user_data)
 
-        except AuthApiError as e:
-            raise ValueError(f"Registration failed: {str(e)}")
+        except (AuthError, httpx.HTTPError) as e:
+            raise ValueError(f"Registration failed: {str(e)}") from e
 
     async def authenticate_user(self, email: str, password: str) -> Optional[UserInDB]:
         """
@@ -59,29 +103,27 @@ class AuthService:
             Optional[UserInDB]: Authenticated user details
         """
         try:
-            # Authenticate with Supabase
-            self.supabase.auth.sign_in_with_password(
-                {"email": email, "password": password}
+            # Authenticate with Supabase, which is the only place passwords
+            # are stored and checked, while retrieving user details from the
+            # users table; the row is discarded if authentication fails
+            _, users = await asyncio.gather(
+                asyncio.to_thread(
+                    self.supabase.auth.sign_in_with_password,
+                    {"email": email, "password": password},
+                ),
+                users_crud.read({"email": email}),
             )
 
-            # Retrieve user details from Users table
-            user_result = (
-                self.supabase.table("users").select("*").eq("email", email).execute()
-            )
-
-            if not user_result.data:
+            if not users:
                 raise ValueError("User not found")
 
-            user_data = user_result.data[0]
-
-            # Extra verification (optional)
-            if not verify_password(password, user_data.get("hashed_password", "")):
-                raise ValueError("Invalid credentials")
+            user_data = users[0]
 
-            return UserInDB(**user_data)
+            # Rows from the users table are already valid, so skip validation
+            return UserInDB.model_construct(**user_data)
 
-        except AuthApiError as e:
-            raise ValueError(f"Authentication failed: {str(e)}")
+        except (AuthError, httpx.HTTPError) as e:
+            raise ValueError(f"Authentication failed: {str(e)}") from e
 
     async def create_user_token(self, user: UserInDB) -> Dict[str, str]:
         """
@@ -93,17 +135,15 @@ class AuthService:
         Returns:
             Dict[str, str]: Token details
         """
-        access_token_expires = timedelta(minutes=30)
         access_token = create_access_token(
-            data={"sub": user.email}, expires_delta=access_token_expires
+            data={"sub": user.email}, expires_delta=_ACCESS_TOKEN_TTL
         )
 
         return {"access_token": access_token, "token_type": "bearer"}
 
 
-class ProfileService:
-    def __init__(self, supabase_client: Client):
-        self.supabase = supabase_client
+class ProfileService(SupabaseService):
+    __slots__ = ()
 
     async def update_profile(
         self, user_id: str, profile_update: Dict[str, Any]
@@ -119,33 +159,36 @@ class ProfileService:
             Dict[str, Any]: Updated profile
         """
         # Validate profile type
-        valid_profile_types = ["personal", "professional", "social"]
-
         if (
             profile_update.get("profile_type")
-            and profile_update["profile_type"] not in valid_profile_types
+            and profile_update["profile_type"] not in _VALID_PROFILE_TYPES
         ):
             raise ValueError(
-                f"Invalid profile type. Must be one of {valid_profile_types}"
+                f"Invalid profile type. Must be one of {_VALID_PROFILE_TYPES_STR}"
             )
 
-        # Update user metadata in Supabase
+        # Only send each store the fields it keeps
+        auth_fields = {k: v for k, v in profile_update.items() if k in _AUTH_FIELDS}
+        db_fields = {
+            k: v for k, v in profile_update.items() if k not in _AUTH_ONLY_FIELDS
+        }
+
+        # Update Supabase Auth and the users table concurrently
         try:
-            # Update user metadata
-            self.supabase.auth.update_user({"data": profile_update})
-
-            # Update user details in users table
-            result = (
-                self.supabase.table("users")
-                .update(profile_update)
-                .eq("id", user_id)
-                .execute()
-            )
+            updates = []
+            if auth_fields:
+                updates.append(
+                    asyncio.to_thread(self.supabase.auth.update_user, auth_fields)
+                )
+            if db_fields:
+                updates.append(users_crud.update("id", user_id, db_fields))
 
-            return result.data[0] if result.data else {}
+            results = await asyncio.gather(*updates)
 
-        except Exception as e:
-            raise ValueError(f"Profile update failed: {str(e)}")
+            return (results[-1] or {}) if db_fields else {}
+
+        except (AuthError, ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"Profile update failed: {str(e)}") from e
 
     async def get_specific_profile(
         self, user_id: str, profile_type: str
@@ -160,32 +203,50 @@ class ProfileService:
         Returns:
             Dict[str, Any]: Profile details
         """
-        valid_profile_types = ["personal", "professional", "social"]
-
-        if profile_type not in valid_profile_types:
+        if profile_type not in _VALID_PROFILE_TYPES:
             raise ValueError(
-                f"Invalid profile type. Must be one of {valid_profile_types}"
+                f"Invalid profile type. Must be one of {_VALID_PROFILE_TYPES_STR}"
             )
 
         try:
             # Retrieve user profile from Supabase
-            result = (
-                self.supabase.table("users")
-                .select("*")
-                .eq("id", user_id)
-                .single()
-                .execute()
+            return await users_crud.get_by_id("id", user_id) or {}
+
+        except (ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"Profile retrieval failed: {str(e)}") from e
+
+    async def get_user_with_profiles(self, user_id: str) -> Dict[str, Any]:
+        """
+        Retrieve the user together with all of their profiles
+
+        Args:
+            user_id (str): Supabase user ID
+
+        Returns:
+            Dict[str, Any]: User details with a ``profiles`` list
+        """
+        try:
+            # Fetch the user row and all of their profiles, details joined in
+            # by the database, concurrently rather than per profile
+            user, profiles = await asyncio.gather(
+                users_crud.get_by_id("id", user_id),
+                profile_crud.rpc(
+                    "list_profiles_for_user",
+                    {"p_user": user_id, "p_include_connections": False},
+                ),
             )
 
-            return result.data or {}
+        except (ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"Profile retrieval failed: {str(e)}") from e
 
-        except Exception as e:
-            raise ValueError(f"Profile retrieval failed: {str(e)}")
+        if not user:
+            raise ValueError("User not found")
 
+        return {**user, "profiles": profiles or []}
 
-class NFCSharingService:
-    def __init__(self, supabase_client: Client):
-        self.supabase = supabase_client
+
+class NFCSharingService(SupabaseService):
+    __slots__ = ()
 
     async def generate_nfc_token(
         self, user_id: str, profile_type: str
@@ -200,35 +261,49 @@ class NFCSharingService:
         Returns:
             Dict[str, Any]: NFC token details
         """
-        valid_profile_types = ["personal", "professional", "social"]
+        tokens = await self.generate_nfc_tokens_bulk(user_id, [profile_type])
+        return tokens[0] if tokens else {}
 
-        if profile_type not in valid_profile_types:
-            raise ValueError(
-                f"Invalid profile type. Must be one of {valid_profile_types}"
-            )
+    async def generate_nfc_tokens_bulk(
+        self, user_id: str, profile_types: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate NFC sharing tokens for several profile types at once
 
-        # Create unique token
-        token = str(uuid.uuid4())
+        Args:
+            user_id (str): Supabase user ID
+            profile_types (List[str]): Profile types for NFC sharing
 
-        # Set expiration (default 24 hours)
-        expires_at = datetime.utcnow() + timedelta(hours=24)
+        Returns:
+            List[Dict[str, Any]]: NFC token details, one per profile type
+        """
+        profile_types = list(dict.fromkeys(profile_types))
+        if any(t not in _NFC_PROFILE_TYPES for t in profile_types):
+            raise ValueError(
+                f"Invalid profile type. Must be one of {_NFC_PROFILE_TYPES_STR}"
+            )
 
-        # Create NFC token in Supabase
+        # Issue all the tokens in one database call, which revokes the user's
+        # previous token for each type and mints and hashes the new ones
         try:
-            nfc_token_data = {
-                "user_id": user_id,
-                "token": token,
-                "profile_type": profile_type,
-                "expires_at": expires_at.isoformat(),
-                "is_active": True,
-            }
-
-            result = self.supabase.table("nfc_tokens").insert(nfc_token_data).execute()
+            issued = await nfc_crud.rpc(
+                "issue_nfc_tokens",
+                {
+                    "p_user": user_id,
+                    "p_types": profile_types,
+                    "p_lifetime_seconds": _TOKEN_TTL_SECONDS,
+                },
+            )
 
-            return result.data[0] if result.data else {}
+        except (ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"NFC token generation failed: {str(e)}") from e
 
-        except Exception as e:
-            raise ValueError(f"NFC token generation failed: {str(e)}")
+        tokens = []
+        for row in issued or []:
+            for revoked_token_hash in row["revoked_token_hashes"]:
+                invalidate_token(revoked_token_hash)
+            tokens.append(row["token_row"])
+        return tokens
 
     async def share_profile_via_nfc(
         self, current_user_id: str, nfc_token: str
@@ -244,47 +319,32 @@ class NFCSharingService:
             Dict[str, Any]: Shared profile details
         """
         try:
-            # Find the NFC token
-            token_result = (
-                self.supabase.table("nfc_tokens")
-                .select("*")
-                .eq("token", nfc_token)
-                .single()
-                .execute()
+            # Find the NFC token if it is active and unexpired; Postgres
+            # evaluates "now" itself, so expired tokens never leave the database
+            tokens = await nfc_crud.read(
+                {"token": nfc_token, "is_active": True},
+                greater_than={"expires_at": "now"},
             )
 
-            token_data = token_result.data
-
             # Validate token
-            if not token_data:
-                raise ValueError("Invalid NFC token")
+            if not tokens:
+                raise ValueError("Invalid or expired NFC token")
 
-            # Check token expiration
-            expires_at = datetime.fromisoformat(token_data["expires_at"])
-            if expires_at < datetime.utcnow():
-                raise ValueError("NFC token has expired")
+            token_data = tokens[0]
 
             # Ensure the token belongs to a different user
             if token_data["user_id"] == current_user_id:
                 raise ValueError("Cannot use your own NFC token")
 
             # Retrieve token owner's profile
-            user_result = (
-                self.supabase.table("users")
-                .select("*")
-                .eq("id", token_data["user_id"])
-                .single()
-                .execute()
-            )
-
-            return user_result.data or {}
+            return await users_crud.get_by_id("id", token_data["user_id"]) or {}
 
-        except Exception as e:
-            raise ValueError(f"NFC profile sharing failed: {str(e)}")
+        except (ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"NFC profile sharing failed: {str(e)}") from e
 
     async def get_user_nfc_tokens(self, user_id: str) -> list:
         """
-        Retrieve all active NFC tokens for the current user
+        Retrieve the current user's active NFC tokens, soonest to expire first
 
         Args:
             user_id (str): Supabase user ID
@@ -293,16 +353,18 @@ class NFCSharingService:
             list: Active NFC tokens
         """
         try:
-            # Query active NFC tokens
-            result = (
-                self.supabase.table("nfc_tokens")
-                .select("*")
-                .eq("user_id", user_id)
-                .gt("expires_at", datetime.utcnow().isoformat())
-                .execute()
+            # Query active NFC tokens; Postgres evaluates "now" itself, so
+            # expiry is checked against the database clock
+            return (
+                await nfc_crud.read(
+                    {"user_id": user_id, "is_active": True},
+                    columns="token,profile_type,expires_at,created_at",
+                    greater_than={"expires_at": "now"},
+                    order_by="expires_at",
+                    limit=_NFC_TOKEN_LIST_LIMIT,
+                )
+                or []
             )
 
-            return result.data or []
-
-        except Exception as e:
-            raise ValueError(f"NFC tokens retrieval failed: {str(e)}")
+        except (ValueError, httpx.HTTPError) as e:
+            raise ValueError(f"NFC tokens retrieval failed: {str(e)}") from e
@@ -0,0 +1,15 @@
+-- Look up an active NFC token together with the profile it shares, so the
+-- API can validate a token in a single round-trip
+CREATE OR REPLACE FUNCTION get_active_token_with_profile(p_token text)
+RETURNS TABLE (token_row jsonb, profile_row jsonb, expires_in double precision)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        to_jsonb(t),
+        to_jsonb(p),
+        EXTRACT(EPOCH FROM t.expires_at - now())
+    FROM nfc_tokens t
+    LEFT JOIN profiles p ON p.user_id = t.user_id AND p.type = t.profile_type
+    WHERE t.token = p_token AND t.is_active;
+$$;
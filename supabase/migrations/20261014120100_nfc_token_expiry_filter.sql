@@ -0,0 +1,16 @@
+-- Filter out expired tokens in the lookup itself so callers have a single
+-- "invalid or expired" path. Stale rows stay active until the owner issues a
+-- new token for the same profile type, but they are never returned here.
+CREATE OR REPLACE FUNCTION get_active_token_with_profile(p_token text)
+RETURNS TABLE (token_row jsonb, profile_row jsonb, expires_in double precision)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        to_jsonb(t),
+        to_jsonb(p),
+        EXTRACT(EPOCH FROM t.expires_at - now())
+    FROM nfc_tokens t
+    LEFT JOIN profiles p ON p.user_id = t.user_id AND p.type = t.profile_type
+    WHERE t.token = p_token AND t.is_active AND t.expires_at > now();
+$$;
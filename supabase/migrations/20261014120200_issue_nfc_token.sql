@@ -0,0 +1,46 @@
+-- Keep only the newest active token per profile type before enforcing it
+UPDATE nfc_tokens t
+SET is_active = false
+WHERE t.is_active
+  AND EXISTS (
+      SELECT 1 FROM nfc_tokens n
+      WHERE n.user_id = t.user_id
+        AND n.profile_type = t.profile_type
+        AND n.is_active
+        AND n.created_at > t.created_at
+  );
+
+-- A user may only have one active token per profile type
+CREATE UNIQUE INDEX idx_nfc_tokens_active_profile
+    ON nfc_tokens(user_id, profile_type) WHERE is_active;
+
+-- Deactivate the user's previous tokens for a profile type and issue a new
+-- one atomically. Returns the new row and the tokens that were revoked.
+CREATE OR REPLACE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_token text,
+    p_expires timestamptz
+)
+RETURNS TABLE (token_row jsonb, revoked_tokens text[])
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_revoked text[];
+    v_token nfc_tokens;
+BEGIN
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = p_type AND is_active
+        RETURNING token
+    )
+    SELECT COALESCE(array_agg(token), '{}') INTO v_revoked FROM revoked;
+
+    INSERT INTO nfc_tokens (user_id, token, profile_type, is_active, expires_at)
+    VALUES (p_user, p_token, p_type, true, p_expires)
+    RETURNING * INTO v_token;
+
+    RETURN QUERY SELECT to_jsonb(v_token), v_revoked;
+END;
+$$;
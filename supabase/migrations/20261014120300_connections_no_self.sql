@@ -0,0 +1,7 @@
+-- Duplicate connections are already rejected by UNIQUE(user_id, connected_user_id);
+-- also reject users connecting with themselves
+-- Existing self-connections would fail the check, so remove them first
+DELETE FROM connections WHERE user_id = connected_user_id;
+
+ALTER TABLE connections
+    ADD CONSTRAINT connections_not_self CHECK (user_id <> connected_user_id);
@@ -0,0 +1,14 @@
+-- Deactivate every expired NFC token in one statement; run periodically by
+-- the API instead of deactivating tokens one at a time as they are seen
+CREATE OR REPLACE FUNCTION deactivate_expired_nfc_tokens()
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH expired AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE is_active AND expires_at <= now()
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM expired;
+$$;
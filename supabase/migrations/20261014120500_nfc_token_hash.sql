@@ -0,0 +1,63 @@
+-- Store a SHA-256 hash of each NFC token and look tokens up by it, so
+-- lookups never send or compare the plaintext token. The plaintext column
+-- can be dropped once nothing reads it.
+ALTER TABLE nfc_tokens ADD COLUMN token_hash bytea;
+UPDATE nfc_tokens SET token_hash = sha256(convert_to(token, 'UTF8'));
+ALTER TABLE nfc_tokens ALTER COLUMN token_hash SET NOT NULL;
+ALTER TABLE nfc_tokens ADD CONSTRAINT nfc_tokens_token_hash_key UNIQUE (token_hash);
+
+-- Look up an active, unexpired token by its hex-encoded hash
+DROP FUNCTION get_active_token_with_profile(text);
+CREATE FUNCTION get_active_token_with_profile(p_token_hash text)
+RETURNS TABLE (token_row jsonb, profile_row jsonb, expires_in double precision)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        to_jsonb(t),
+        to_jsonb(p),
+        EXTRACT(EPOCH FROM t.expires_at - now())
+    FROM nfc_tokens t
+    LEFT JOIN profiles p ON p.user_id = t.user_id AND p.type = t.profile_type
+    WHERE t.token_hash = decode(p_token_hash, 'hex')
+      AND t.is_active
+      AND t.expires_at > now();
+$$;
+
+-- Issue a token storing its hash; revoked tokens are reported by hash
+DROP FUNCTION issue_nfc_token(uuid, profile_type, text, timestamptz);
+CREATE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_token text,
+    p_token_hash text,
+    p_expires timestamptz
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_revoked text[];
+    v_token nfc_tokens;
+BEGIN
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = p_type AND is_active
+        RETURNING token_hash
+    )
+    SELECT COALESCE(array_agg(encode(token_hash, 'hex')), '{}')
+    INTO v_revoked
+    FROM revoked;
+
+    INSERT INTO nfc_tokens (
+        user_id, token, token_hash, profile_type, is_active, expires_at
+    )
+    VALUES (
+        p_user, p_token, decode(p_token_hash, 'hex'), p_type, true, p_expires
+    )
+    RETURNING * INTO v_token;
+
+    RETURN QUERY SELECT to_jsonb(v_token), v_revoked;
+END;
+$$;
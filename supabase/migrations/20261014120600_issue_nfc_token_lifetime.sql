@@ -0,0 +1,43 @@
+-- Compute NFC token expiry in the database from a lifetime in seconds, so the
+-- API does no clock arithmetic or timestamp formatting when issuing tokens
+DROP FUNCTION issue_nfc_token(uuid, profile_type, text, text, timestamptz);
+CREATE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_token text,
+    p_token_hash text,
+    p_lifetime_seconds integer
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_revoked text[];
+    v_token nfc_tokens;
+BEGIN
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = p_type AND is_active
+        RETURNING token_hash
+    )
+    SELECT COALESCE(array_agg(encode(token_hash, 'hex')), '{}')
+    INTO v_revoked
+    FROM revoked;
+
+    INSERT INTO nfc_tokens (
+        user_id, token, token_hash, profile_type, is_active, expires_at
+    )
+    VALUES (
+        p_user,
+        p_token,
+        decode(p_token_hash, 'hex'),
+        p_type,
+        true,
+        now() + make_interval(secs => p_lifetime_seconds)
+    )
+    RETURNING * INTO v_token;
+
+    RETURN QUERY SELECT to_jsonb(v_token), v_revoked;
+END;
+$$;
@@ -0,0 +1,68 @@
+-- Return only the token columns callers use; in particular, never send the
+-- plaintext token or its hash back to the API on lookups
+CREATE OR REPLACE FUNCTION get_active_token_with_profile(p_token_hash text)
+RETURNS TABLE (token_row jsonb, profile_row jsonb, expires_in double precision)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        jsonb_build_object(
+            'id', t.id,
+            'user_id', t.user_id,
+            'profile_type', t.profile_type
+        ),
+        to_jsonb(p),
+        EXTRACT(EPOCH FROM t.expires_at - now())
+    FROM nfc_tokens t
+    LEFT JOIN profiles p ON p.user_id = t.user_id AND p.type = t.profile_type
+    WHERE t.token_hash = decode(p_token_hash, 'hex')
+      AND t.is_active
+      AND t.expires_at > now();
+$$;
+
+CREATE OR REPLACE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_token text,
+    p_token_hash text,
+    p_lifetime_seconds integer
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_revoked text[];
+    v_token nfc_tokens;
+BEGIN
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = p_type AND is_active
+        RETURNING token_hash
+    )
+    SELECT COALESCE(array_agg(encode(token_hash, 'hex')), '{}')
+    INTO v_revoked
+    FROM revoked;
+
+    INSERT INTO nfc_tokens (
+        user_id, token, token_hash, profile_type, is_active, expires_at
+    )
+    VALUES (
+        p_user,
+        p_token,
+        decode(p_token_hash, 'hex'),
+        p_type,
+        true,
+        now() + make_interval(secs => p_lifetime_seconds)
+    )
+    RETURNING * INTO v_token;
+
+    RETURN QUERY SELECT
+        jsonb_build_object(
+            'token', v_token.token,
+            'profile_type', v_token.profile_type,
+            'expires_at', v_token.expires_at
+        ),
+        v_revoked;
+END;
+$$;
@@ -0,0 +1,57 @@
+-- Mint NFC tokens in the database: 24 random bytes, base64url-encoded
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+ALTER TABLE nfc_tokens
+    ALTER COLUMN token
+    SET DEFAULT translate(encode(gen_random_bytes(24), 'base64'), '+/=', '-_');
+
+-- issue_nfc_token now generates the token and its hash itself
+DROP FUNCTION issue_nfc_token(uuid, profile_type, text, text, integer);
+CREATE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_lifetime_seconds integer
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE plpgsql
+SET search_path = public, extensions
+AS $$
+DECLARE
+    v_revoked text[];
+    v_token nfc_tokens;
+BEGIN
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = p_type AND is_active
+        RETURNING token_hash
+    )
+    SELECT COALESCE(array_agg(encode(token_hash, 'hex')), '{}')
+    INTO v_revoked
+    FROM revoked;
+
+    WITH minted AS (
+        SELECT translate(encode(gen_random_bytes(24), 'base64'), '+/=', '-_') AS token
+    )
+    INSERT INTO nfc_tokens (
+        user_id, token, token_hash, profile_type, is_active, expires_at
+    )
+    SELECT
+        p_user,
+        minted.token,
+        sha256(convert_to(minted.token, 'UTF8')),
+        p_type,
+        true,
+        now() + make_interval(secs => p_lifetime_seconds)
+    FROM minted
+    RETURNING * INTO v_token;
+
+    RETURN QUERY SELECT
+        jsonb_build_object(
+            'token', v_token.token,
+            'profile_type', v_token.profile_type,
+            'expires_at', v_token.expires_at
+        ),
+        v_revoked;
+END;
+$$;
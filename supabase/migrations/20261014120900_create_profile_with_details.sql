@@ -0,0 +1,45 @@
+-- Create a base profile and its type-specific details in one transaction.
+-- UNIQUE(user_id, type) on profiles rejects a second profile of the same type.
+CREATE OR REPLACE FUNCTION create_profile_with_details(
+    p_user uuid,
+    p_type profile_type,
+    p_name text,
+    p_photo text,
+    p_details jsonb
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_profile profiles;
+    v_details jsonb;
+    v_row jsonb;
+BEGIN
+    INSERT INTO profiles (user_id, type, name, photo)
+    VALUES (p_user, p_type, p_name, p_photo)
+    RETURNING * INTO v_profile;
+
+    v_row := p_details || jsonb_build_object('profile_id', v_profile.id);
+
+    CASE p_type
+        WHEN 'family' THEN
+            INSERT INTO family_profiles
+            SELECT * FROM jsonb_populate_record(NULL::family_profiles, v_row)
+            RETURNING to_jsonb(family_profiles.*) INTO v_details;
+        WHEN 'friends' THEN
+            INSERT INTO friends_profiles
+            SELECT * FROM jsonb_populate_record(NULL::friends_profiles, v_row)
+            RETURNING to_jsonb(friends_profiles.*) INTO v_details;
+        WHEN 'work' THEN
+            INSERT INTO work_profiles
+            SELECT * FROM jsonb_populate_record(NULL::work_profiles, v_row)
+            RETURNING to_jsonb(work_profiles.*) INTO v_details;
+        WHEN 'acquaintances' THEN
+            INSERT INTO acquaintances_profiles
+            SELECT * FROM jsonb_populate_record(NULL::acquaintances_profiles, v_row)
+            RETURNING to_jsonb(acquaintances_profiles.*) INTO v_details;
+    END CASE;
+
+    RETURN to_jsonb(v_profile) || v_details;
+END;
+$$;
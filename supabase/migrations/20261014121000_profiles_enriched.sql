@@ -0,0 +1,49 @@
+-- Base profiles merged with their type-specific details
+CREATE OR REPLACE VIEW profiles_enriched AS
+SELECT
+    p.id,
+    p.user_id,
+    p.type,
+    to_jsonb(p) || COALESCE(
+        to_jsonb(f), to_jsonb(fr), to_jsonb(w), to_jsonb(a), '{}'::jsonb
+    ) AS profile
+FROM profiles p
+LEFT JOIN family_profiles f ON f.profile_id = p.id AND p.type = 'family'
+LEFT JOIN friends_profiles fr ON fr.profile_id = p.id AND p.type = 'friends'
+LEFT JOIN work_profiles w ON w.profile_id = p.id AND p.type = 'work'
+LEFT JOIN acquaintances_profiles a
+    ON a.profile_id = p.id AND p.type = 'acquaintances';
+
+-- A user's own profiles followed by the profiles of the users they are
+-- connected to, annotated with is_own and the connection they came from
+CREATE OR REPLACE FUNCTION list_profiles_for_user(
+    p_user uuid,
+    p_include_connections boolean DEFAULT true
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(
+        jsonb_agg(entries.profile ORDER BY entries.is_connection),
+        '[]'::jsonb
+    )
+    FROM (
+        SELECT
+            pe.profile || jsonb_build_object('is_own', true) AS profile,
+            false AS is_connection
+        FROM profiles_enriched pe
+        WHERE pe.user_id = p_user
+        UNION ALL
+        SELECT
+            pe.profile || jsonb_build_object(
+                'connection_id', c.id,
+                'connection_type', c.connection_type,
+                'is_own', false
+            ),
+            true
+        FROM connections c
+        JOIN profiles_enriched pe ON pe.user_id = c.connected_user_id
+        WHERE c.user_id = p_user AND p_include_connections
+    ) entries;
+$$;
@@ -0,0 +1,73 @@
+-- Update a base profile and its type-specific details in one transaction,
+-- only when the profile belongs to p_user and has type p_type. Keys missing
+-- from p_base and p_details keep their stored values. Returns NULL when no
+-- profile matched.
+CREATE OR REPLACE FUNCTION update_profile_with_details(
+    p_profile_id uuid,
+    p_user uuid,
+    p_type profile_type,
+    p_base jsonb,
+    p_details jsonb
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_profile profiles;
+    v_details jsonb;
+BEGIN
+    IF p_base = '{}'::jsonb THEN
+        SELECT * INTO v_profile
+        FROM profiles
+        WHERE id = p_profile_id AND user_id = p_user AND type = p_type
+        FOR UPDATE;
+    ELSE
+        UPDATE profiles p
+        SET (name, photo) = (
+            SELECT r.name, r.photo FROM jsonb_populate_record(p, p_base) r
+        )
+        WHERE p.id = p_profile_id AND p.user_id = p_user AND p.type = p_type
+        RETURNING p.* INTO v_profile;
+    END IF;
+
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    CASE p_type
+        WHEN 'family' THEN
+            UPDATE family_profiles t
+            SET (phone_number, email, date_of_birth, whatsapp) = (
+                SELECT r.phone_number, r.email, r.date_of_birth, r.whatsapp
+                FROM jsonb_populate_record(t, p_details) r
+            )
+            WHERE t.profile_id = p_profile_id
+            RETURNING to_jsonb(t.*) INTO v_details;
+        WHEN 'friends' THEN
+            UPDATE friends_profiles t
+            SET (phone_number, email, instagram, snapchat) = (
+                SELECT r.phone_number, r.email, r.instagram, r.snapchat
+                FROM jsonb_populate_record(t, p_details) r
+            )
+            WHERE t.profile_id = p_profile_id
+            RETURNING to_jsonb(t.*) INTO v_details;
+        WHEN 'work' THEN
+            UPDATE work_profiles t
+            SET (whatsapp, telegram, linkedin, resume, website) = (
+                SELECT r.whatsapp, r.telegram, r.linkedin, r.resume, r.website
+                FROM jsonb_populate_record(t, p_details) r
+            )
+            WHERE t.profile_id = p_profile_id
+            RETURNING to_jsonb(t.*) INTO v_details;
+        WHEN 'acquaintances' THEN
+            UPDATE acquaintances_profiles t
+            SET email = (
+                SELECT r.email FROM jsonb_populate_record(t, p_details) r
+            )
+            WHERE t.profile_id = p_profile_id
+            RETURNING to_jsonb(t.*) INTO v_details;
+    END CASE;
+
+    RETURN to_jsonb(v_profile) || COALESCE(v_details, '{}'::jsonb);
+END;
+$$;
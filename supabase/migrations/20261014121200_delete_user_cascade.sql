@@ -0,0 +1,11 @@
+-- Delete all of a user's data in one transaction: their profiles (the
+-- type-specific rows go with them through ON DELETE CASCADE), connections where
+-- they are the owner or the connected user, and their NFC tokens
+CREATE OR REPLACE FUNCTION delete_user_cascade(p_user uuid)
+RETURNS void
+LANGUAGE sql
+AS $$
+    DELETE FROM profiles WHERE user_id = p_user;
+    DELETE FROM connections WHERE user_id = p_user OR connected_user_id = p_user;
+    DELETE FROM nfc_tokens WHERE user_id = p_user;
+$$;
@@ -0,0 +1,5 @@
+-- Serve a user's active, unexpired tokens from an index seek; only active
+-- tokens are indexed, so the index stays small
+CREATE INDEX idx_nfc_tokens_user_active
+    ON nfc_tokens(user_id, expires_at)
+    WHERE is_active;
@@ -0,0 +1,50 @@
+-- profiles_enriched was a plain view owned by the migration role, so it
+-- bypassed RLS on profiles and the detail tables and exposed every user's
+-- details through PostgREST. Join the details inside list_profiles_for_user
+-- instead, which runs with the caller's privileges, and drop the view.
+CREATE OR REPLACE FUNCTION list_profiles_for_user(
+    p_user uuid,
+    p_include_connections boolean DEFAULT true
+)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH owners AS (
+        SELECT
+            p_user AS user_id,
+            jsonb_build_object('is_own', true) AS annotation,
+            false AS is_connection
+        UNION ALL
+        SELECT
+            c.connected_user_id,
+            jsonb_build_object(
+                'connection_id', c.id,
+                'connection_type', c.connection_type,
+                'is_own', false
+            ),
+            true
+        FROM connections c
+        WHERE c.user_id = p_user AND p_include_connections
+    )
+    SELECT COALESCE(
+        jsonb_agg(
+            to_jsonb(p)
+                || COALESCE(
+                    to_jsonb(f), to_jsonb(fr), to_jsonb(w), to_jsonb(a), '{}'::jsonb
+                )
+                || o.annotation
+            ORDER BY o.is_connection
+        ),
+        '[]'::jsonb
+    )
+    FROM owners o
+    JOIN profiles p ON p.user_id = o.user_id
+    LEFT JOIN family_profiles f ON f.profile_id = p.id AND p.type = 'family'
+    LEFT JOIN friends_profiles fr ON fr.profile_id = p.id AND p.type = 'friends'
+    LEFT JOIN work_profiles w ON w.profile_id = p.id AND p.type = 'work'
+    LEFT JOIN acquaintances_profiles a
+        ON a.profile_id = p.id AND p.type = 'acquaintances';
+$$;
+
+DROP VIEW profiles_enriched;
@@ -0,0 +1,3 @@
+-- issue_nfc_token mints the token value itself, so the column default is
+-- never used; drop it so the minting expression lives in one place
+ALTER TABLE nfc_tokens ALTER COLUMN token DROP DEFAULT;
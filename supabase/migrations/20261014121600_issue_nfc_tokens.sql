@@ -0,0 +1,79 @@
+-- Issue NFC tokens for several profile types at once: one UPDATE revokes the
+-- user's active tokens for all of the types and one INSERT mints the new
+-- ones, returning a row per type with the hashes it revoked
+CREATE FUNCTION issue_nfc_tokens(
+    p_user uuid,
+    p_types profile_type[],
+    p_lifetime_seconds integer
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE plpgsql
+SET search_path = public, extensions
+AS $$
+DECLARE
+    v_revoked jsonb;
+BEGIN
+    -- Revoke first, in its own statement, so the new tokens do not clash
+    -- with the old ones on idx_nfc_tokens_active_profile
+    WITH revoked AS (
+        UPDATE nfc_tokens
+        SET is_active = false
+        WHERE user_id = p_user AND profile_type = ANY(p_types) AND is_active
+        RETURNING profile_type, token_hash
+    )
+    SELECT COALESCE(jsonb_object_agg(profile_type, hashes), '{}')
+    INTO v_revoked
+    FROM (
+        SELECT profile_type, array_agg(encode(token_hash, 'hex')) AS hashes
+        FROM revoked
+        GROUP BY profile_type
+    ) AS by_type;
+
+    RETURN QUERY
+    WITH minted AS (
+        SELECT
+            types.profile_type,
+            translate(encode(gen_random_bytes(24), 'base64'), '+/=', '-_') AS token
+        FROM (SELECT DISTINCT unnest(p_types) AS profile_type) AS types
+    ),
+    inserted AS (
+        INSERT INTO nfc_tokens (
+            user_id, token, token_hash, profile_type, is_active, expires_at
+        )
+        SELECT
+            p_user,
+            minted.token,
+            sha256(convert_to(minted.token, 'UTF8')),
+            minted.profile_type,
+            true,
+            now() + make_interval(secs => p_lifetime_seconds)
+        FROM minted
+        RETURNING nfc_tokens.token, nfc_tokens.profile_type, nfc_tokens.expires_at
+    )
+    SELECT
+        jsonb_build_object(
+            'token', inserted.token,
+            'profile_type', inserted.profile_type,
+            'expires_at', inserted.expires_at
+        ),
+        ARRAY(
+            SELECT jsonb_array_elements_text(
+                COALESCE(v_revoked -> inserted.profile_type::text, '[]')
+            )
+        )
+    FROM inserted;
+END;
+$$;
+
+-- Issuing a single token is the one-type case, so tokens are minted in one
+-- place only
+CREATE OR REPLACE FUNCTION issue_nfc_token(
+    p_user uuid,
+    p_type profile_type,
+    p_lifetime_seconds integer
+)
+RETURNS TABLE (token_row jsonb, revoked_token_hashes text[])
+LANGUAGE sql
+AS $$
+    SELECT * FROM issue_nfc_tokens(p_user, ARRAY[p_type], p_lifetime_seconds);
+$$;